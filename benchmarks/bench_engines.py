@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""对比各 Excel 读取后端在同一批文件上的读取 + 解析耗时
+
+用法：python benchmarks/bench_engines.py [文件 ...]
+不传文件时生成一个 50000 行的临时 xlsx。未安装的后端会标记为跳过。
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from ordermerge.parser import OrderProcessor, EXCEL_ENGINES, ENGINE_PREFERENCE, engine_installed  # noqa: E402
+
+
+def make_xlsx(path, n_rows=50000):
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(["XIDP-1234567890", "2024-01-01"])
+    ws.append(["序号", "品名", "规格", "单位", "数量", "单价", "备注"])
+    for i in range(n_rows):
+        ws.append([i + 1, f"物料{i}", f"M{i % 50}", "個", i % 7 + 1, 1.25, ""])
+    wb.save(path)
+
+
+def bench(file_path, engine):
+    processor = OrderProcessor()
+    processor.excel_engine = engine
+    t0 = time.perf_counter()
+    sections = processor.parse_file_to_sections(file_path)
+    return time.perf_counter() - t0, sum(len(s['data_rows']) for s in sections)
+
+
+if __name__ == "__main__":
+    files = sys.argv[1:]
+    if not files:
+        files = [os.path.join(tempfile.mkdtemp(), "bench.xlsx")]
+        make_xlsx(files[0])
+
+    for file_path in files:
+        print(os.path.basename(file_path))
+        ext = os.path.splitext(file_path)[1].lower()
+        for engine in EXCEL_ENGINES:
+            if engine not in ENGINE_PREFERENCE.get(ext, []):
+                continue
+            if not engine_installed(engine):
+                print(f"  {engine:<10} 未安装，跳过")
+                continue
+            cost, n_rows = bench(file_path, engine)
+            print(f"  {engine:<10} {cost:>8.3f}s  {n_rows} 行")
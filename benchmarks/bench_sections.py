@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""单个工单区块行数与解析耗时的关系：每行耗时应基本恒定（线性扩展）
+
+用法：python benchmarks/bench_sections.py [行数 ...]
+"""
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from ordermerge.parser import OrderProcessor  # noqa: E402
+
+
+def make_sheet(n_rows):
+    rows = [["XIDP-1234567890", "2024-01-01", "", "", "", ""],
+            ["序号", "品名", "规格", "单位", "数量", "单价"]]
+    for i in range(n_rows):
+        rows.append([str(i + 1), f"物料{i}", f"M{i % 50}", "個", str(i % 7 + 1), "1.25"])
+    return pd.DataFrame(rows, dtype=str)
+
+
+def bench(n_rows):
+    df = make_sheet(n_rows)
+    processor = OrderProcessor()
+    processor.read_excel_smart = lambda _path: df
+    t0 = time.perf_counter()
+    sections = processor.parse_file_to_sections("<memory>")
+    cost = time.perf_counter() - t0
+    assert len(sections[0]['data_rows']) == n_rows
+    return cost
+
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or [2500, 5000, 10000, 20000]
+    print(f"{'行数':>8} {'总耗时(s)':>10} {'每行(us)':>10}")
+    for n in sizes:
+        cost = bench(n)
+        print(f"{n:>8} {cost:>10.3f} {cost / n * 1e6:>10.1f}")
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""启动时导入耗时：用 python -X importtime 导入指定模块，按顶层包汇总各模块自身耗时
+
+用法：python benchmarks/bench_startup.py [模块 ...]
+默认比较 ordermerge.gui（图形界面冷启动：PySide6 与 ordermerge.config，合并引擎在窗口显示后才在后台导入）、
+ordermerge.cli 与 ordermerge.engine。main.py 只在 __main__ 中导入 ordermerge.gui，import main 测不到界面的启动耗时。
+每个模块在新进程中导入 REPEAT 次取最小值，结果不受磁盘缓存预热顺序影响。
+"""
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+REPEAT = 3
+TOP_N = 8
+
+
+def import_times(module):
+    """返回 {顶层包: 微秒} 与总耗时；按各模块自身耗时（self 列）汇总，嵌套导入不会重复计算"""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    per_pkg = defaultdict(int)
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line: continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit(): continue
+        per_pkg[name.strip().split(".")[0]] += int(self_us)
+    return per_pkg, sum(per_pkg.values())
+
+
+if __name__ == "__main__":
+    modules = sys.argv[1:] or ["ordermerge.gui", "ordermerge.cli", "ordermerge.engine"]
+    for module in modules:
+        try:
+            per_pkg, total = min((import_times(module) for _ in range(REPEAT)), key=lambda r: r[1])
+        except RuntimeError as e:
+            # 没装 PySide6 时 ordermerge.gui 无法导入，只说明原因
+            reason = "PySide6 未安装" if "No module named 'PySide6'" in str(e) else f"导入失败：{e}"
+            print(f"{module:<20} {reason}")
+            continue
+        print(f"{module:<20} 合计 {total / 1000:>8.1f} ms")
+        for pkg, us in sorted(per_pkg.items(), key=lambda kv: -kv[1])[:TOP_N]:
+            print(f"    {pkg:<24} {us / 1000:>8.1f} ms")
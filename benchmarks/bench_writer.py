@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""输出写入（值 + 边框/对齐/数字格式）的每行耗时：改动前的两遍写法、常规与低内存两种写入器
+
+用法：python benchmarks/bench_writer.py [行数 ...]
+每个区块 500 行，只统计 write_section，不含保存；计时后工作簿保存到临时目录再删除。
+"""
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from openpyxl import Workbook  # noqa: E402
+from openpyxl.styles import Border, Side, Alignment  # noqa: E402
+from ordermerge.parser import OrderProcessor  # noqa: E402
+from ordermerge.writer import WorkbookWriter, StreamingWorkbookWriter  # noqa: E402
+
+SECTION_ROWS = 500
+
+
+class TwoPassWriter:
+    """改动前的写法，作为对照：每个单元格新建 Border/Alignment，区块写完后再整块重画一遍外框"""
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.wb = Workbook()
+        self.ws = self.wb.active
+        self.thin, self.thick = Side(border_style="thin"), Side(border_style="medium")
+        self.center = Alignment(horizontal="center", vertical="center", wrap_text=True)
+        self.left_center = Alignment(horizontal="left", vertical="center", wrap_text=True)
+        self.curr_row = 2
+
+    def write_section(self, section, rows):
+        ws, thin = self.ws, self.thin
+        start_row = self.curr_row
+        ws.cell(self.curr_row, 1, section['date']).alignment = self.center
+        ws.cell(self.curr_row, 2, section['info']).alignment = self.left_center
+        ws.cell(self.curr_row, 3, section['order_no']).alignment = self.center
+        for c in range(1, 9): ws.cell(self.curr_row, c).border = Border(top=thin, left=thin, right=thin, bottom=thin)
+        self.curr_row += 1
+
+        for written_count, row in enumerate(rows, 1):
+            for col_idx, col_name in enumerate(self.columns, 1):
+                val = written_count if col_name == '序号' else row[col_name]
+                cell = ws.cell(self.curr_row, col_idx, val)
+                cell.border = Border(top=thin, left=thin, right=thin, bottom=thin)
+                cell.alignment = self.center if col_name in ['序号', '单位', '数量'] else Alignment(
+                    vertical="center", horizontal="left")
+                if col_name in ['单价', '金额']: cell.number_format = '0.00'
+            self.curr_row += 1
+
+        if not rows:
+            self.curr_row -= 1
+        else:
+            self.apply_outer_border(start_row, self.curr_row - 1)
+            self.curr_row += 1
+
+    def apply_outer_border(self, start_r, end_r):
+        thick, thin = self.thick, self.thin
+        for r in range(start_r, end_r + 1):
+            for c in range(1, 9):
+                self.ws.cell(r, c).border = Border(left=thick if c == 1 else thin, right=thick if c == 8 else thin,
+                                                   top=thick if r == start_r else thin,
+                                                   bottom=thick if r == end_r else thin)
+
+    def save(self, path):
+        self.wb.save(path)
+
+
+def make_rows(columns):
+    return [{name: (1.5 if name in ['数量', '单价', '金额'] else f"{name}{i}") for name in columns}
+            for i in range(SECTION_ROWS)]
+
+
+def bench(writer_cls, n_rows):
+    columns = OrderProcessor().standard_columns
+    writer = writer_cls(columns)
+    rows = make_rows(columns)
+    t0 = time.perf_counter()
+    for s in range(n_rows // SECTION_ROWS):
+        writer.write_section({'date': '2024-01-01', 'info': '询价人', 'order_no': f"XIDP-{s:010d}"}, rows)
+    cost = time.perf_counter() - t0
+    # write_only 工作簿不保存就不会关闭临时文件，解释器退出时会报 I/O operation on closed file
+    with tempfile.TemporaryDirectory() as tmp:
+        writer.save(os.path.join(tmp, "bench.xlsx"))
+    return cost
+
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or [10000, 50000]
+    print(f"{'写入器':<24} {'行数':>8} {'总耗时(s)':>10} {'每行(us)':>10}")
+    for writer_cls in (TwoPassWriter, WorkbookWriter, StreamingWorkbookWriter):
+        for n in sizes:
+            cost = bench(writer_cls, n)
+            print(f"{writer_cls.__name__:<24} {n:>8} {cost:>10.3f} {cost / n * 1e6:>10.1f}")
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""固定样例上的对照检查：解析结果、流式与整表读取、各写入器与增量合并的输出
+
+用法：python benchmarks/compare_fixtures.py
+样例在 benchmarks/fixtures/ 下，expected/ 中是改动前的解析器（整表 read_excel + 逐行拼接）对每个样例的解析结果。
+依次检查：
+1. 当前解析器切出的区块与 expected/ 一致；
+2. 流式读取与整表读取结果相同：Excel 每块 1、7、5000 行，CSV 每块 1 字节到 8MB，装了 pyarrow 时两种 CSV 读取方式都比；
+3. 常规、低内存写入器与改动前的两遍写法输出的单元格值、边框、对齐、数字格式一致；
+4. 先合并一部分再追加全部文件与一次合并全部的输出一致（首次用哪种写入器都一样），没有新文件时追加不改动输出；
+5. DedupIndex 的单号缓存调到只有 3 个，2 万次随机 in / add 穿插 commit 与普通 set 结果相同，close() 时丢弃未提交的签名；
+6. HashedRowSet 加入 16 万个签名（跨过两次批量并入）过程中与普通 set 结果相同，digests() 打包解包后 add_digest 进新集合仍相同；
+   紧凑去重与普通去重之间经由清单摘要追加，与一次合并一致；
+7. 命令行 python -m ordermerge merge -j 2 的输出与 MergeJob 一致，标准输出只有结果文件路径；
+   找不到输入文件时退出码为 2，没有可写入的明细时为 1，都不生成输出文件。
+有不一致时逐项打印，并以非零状态退出。
+"""
+import os
+import sys
+import json
+import random
+import subprocess
+import hashlib
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+from openpyxl import load_workbook  # noqa: E402
+from ordermerge import parser  # noqa: E402
+from ordermerge.parser import OrderProcessor  # noqa: E402
+from ordermerge.engine import MergeJob  # noqa: E402
+from ordermerge import dedup  # noqa: E402
+from ordermerge.dedup import DedupIndex, HashedRowSet, pack_digests, unpack_digests  # noqa: E402
+from bench_writer import TwoPassWriter  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+FILES = [os.path.join(FIXTURES, name) for name in ("orders.xlsx", "orders_gbk.csv", "orders_bom.csv", "repeat.xlsx")]
+failures = []
+
+
+def check(ok, what):
+    print(f"{'OK  ' if ok else 'FAIL'} {what}")
+    if not ok: failures.append(what)
+
+
+def plain(v):
+    return v.item() if hasattr(v, 'item') else v
+
+
+def parse(path, **attrs):
+    """解析结果转成与 expected/ 相同的纯 JSON 结构"""
+    processor = OrderProcessor()
+    for k, v in attrs.items(): setattr(processor, k, v)
+    sections = [{'order_no': s['order_no'], 'date': s['date'], 'info': s['info'],
+                 'rows': [{k: plain(v) for k, v in row.items()} for row in s['data_rows']]}
+                for s in processor.parse_file_to_sections(path)]
+    return json.loads(json.dumps(sections, ensure_ascii=False))
+
+
+def check_sections():
+    for path in FILES:
+        with open(os.path.join(FIXTURES, "expected", os.path.basename(path) + ".json"), encoding='utf-8') as f:
+            expected = json.load(f)
+        check(parse(path) == expected, f"{os.path.basename(path)}：区块与改动前一致")
+
+
+def check_streaming():
+    has_pyarrow = parser.module_installed('pyarrow')
+    for path in FILES:
+        name, whole = os.path.basename(path), parse(path, streaming=False)
+        if path.endswith('.csv'):
+            # 把 pyarrow 记为未安装即可让 iter_csv_frames 只用 mmap 分块读取
+            for use_pyarrow in ([True, False] if has_pyarrow else [False]):
+                parser._module_installed['pyarrow'] = use_pyarrow
+                for chunk_bytes in (1, 64, 4096, 8 * 1024 * 1024):
+                    check(parse(path, csv_chunk_bytes=chunk_bytes) == whole,
+                          f"{name}：{'pyarrow' if use_pyarrow else 'mmap'} 每块 {chunk_bytes} 字节与整表读取一致")
+            parser._module_installed['pyarrow'] = has_pyarrow
+        else:
+            for chunk_rows in (1, 7, 5000):
+                check(parse(path, chunk_rows=chunk_rows) == whole, f"{name}：每块 {chunk_rows} 行与整表读取一致")
+
+
+def cells(path, first_row=1):
+    ws = load_workbook(path).worksheets[0]
+    out = []
+    for row in ws.iter_rows(min_row=first_row, max_row=ws.max_row, max_col=8):
+        for c in row:
+            b, a = c.border, c.alignment
+            out.append((c.row, c.column, c.value, b.left.style, b.right.style, b.top.style, b.bottom.style,
+                        a.horizontal, a.vertical, a.wrap_text, c.number_format, c.font.b))
+    return out
+
+
+def merge(tmp, name, files, **options):
+    return MergeJob(files, tmp, workers=1, use_cache=False, output_name=name, **options).run()
+
+
+def write_two_pass(path):
+    """按 MergeJob.run 的去重规则把样例交给改动前的两遍写法"""
+    processor = OrderProcessor()
+    writer, seen_rows = TwoPassWriter(processor.standard_columns), set()
+    for f in FILES:
+        for section in processor.parse_file_to_sections(f):
+            rows = []
+            for row in section['data_rows']:
+                sig = (section['order_no'], row['品名'], row['规格/图号'], str(row['数量']))
+                if sig in seen_rows: continue
+                seen_rows.add(sig)
+                rows.append(row)
+            writer.write_section(section, rows)
+    writer.save(path)
+    return path
+
+
+def digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.blake2b(f.read()).hexdigest()
+
+
+def check_outputs():
+    with tempfile.TemporaryDirectory() as tmp:
+        full = merge(tmp, "full.xlsx", FILES)
+        expected = cells(full)
+        check(cells(merge(tmp, "low.xlsx", FILES, low_memory=True)) == expected, "低内存写入器与常规写入器输出一致")
+        # 两遍写法的 TwoPassWriter 不写表头行，从第 2 行起比较
+        check(cells(write_two_pass(os.path.join(tmp, "two_pass.xlsx")), 2) == cells(full, 2),
+              "常规写入器与改动前的两遍写法输出一致")
+        for low_memory in (False, True):
+            out = merge(tmp, f"append_{low_memory}.xlsx", FILES[:2], low_memory=low_memory)
+            merge(tmp, None, FILES, append_to=out)
+            check(cells(out) == expected, f"先合并前两个文件{'（低内存）' if low_memory else ''}再追加全部，与一次合并一致")
+            before = digest(out)
+            merge(tmp, None, FILES, append_to=out)
+            check(digest(out) == before, "没有新文件时追加不改动输出")
+
+
+def check_dedup_index():
+    rng = random.Random(0)
+    # 10 个单号轮流出现，缓存只留 3 个，查询时经常要淘汰或回库；每 50 次操作提交一次
+    sigs = [(f"D{rng.randrange(10)}", f"品名{rng.randrange(20)}", "", str(rng.randrange(5))) for _ in range(2000)]
+    cache_orders, dedup.DEDUP_CACHE_ORDERS = dedup.DEDUP_CACHE_ORDERS, 3
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "seen.db")
+            index, expected, mismatches = DedupIndex(path), set(), 0
+            for i in range(20000):
+                sig = rng.choice(sigs)
+                mismatches += (sig in index) != (sig in expected)
+                if rng.random() < 0.3:
+                    index.add(sig)
+                    expected.add(sig)
+                if i % 50 == 49: index.commit()
+            index.commit()
+            index.close()
+            check(mismatches == 0, "DedupIndex 缓存频繁淘汰时 in / add 与普通 set 一致")
+            index = DedupIndex(path)
+            check(all((sig in index) == (sig in expected) for sig in sigs), "DedupIndex 重新打开后与普通 set 一致")
+            new = [(f"N{i % 7}", f"品名{i}", "", "1") for i in range(100)]
+            index.update(new)
+            check(all(sig in index for sig in new), "DedupIndex 未提交的签名在本次合并内可见")
+            index.close()
+            index = DedupIndex(path)
+            check(not any(sig in index for sig in new) and all(sig in index for sig in expected),
+                  "DedupIndex 未 commit 就 close() 时丢弃新签名，已提交的保留")
+            index.close()
+    finally:
+        dedup.DEDUP_CACHE_ORDERS = cache_orders
+
+
+def check_hashed_row_set():
+    rng = random.Random(0)
+    sigs = [(f"H{rng.randrange(5000)}", f"品名{i}", "", str(rng.randrange(5))) for i in range(160000)]
+    # expected_rows 取小，Bloom 过滤器很快饱和，查找大多要落到摘要数组与待并入集合上
+    rows, expected, mismatches = HashedRowSet(expected_rows=10000), set(), 0
+    for i, sig in enumerate(sigs):
+        if i % 7 == 0:
+            old = sigs[rng.randrange(i + 1)]
+            mismatches += (old in rows) != (old in expected)
+        mismatches += (sig in rows) != (sig in expected)
+        rows.add(sig)
+        expected.add(sig)
+    check(mismatches == 0 and len(rows) == len(expected) and len(rows.table) and rows.pending,
+          "HashedRowSet 跨过批量并入时 in / add 与普通 set 一致")
+    absent = [(f"H{i}", "不存在", "", "1") for i in range(10000)]
+    check(all(sig in rows for sig in sigs) and not any(sig in rows for sig in absent), "HashedRowSet 最终结果与普通 set 一致")
+    restored = HashedRowSet(expected_rows=10000)
+    for d in unpack_digests(pack_digests(rows.digests())): restored.add_digest(d)
+    check(len(restored) == len(rows) and all(sig in restored for sig in sigs)
+          and not any(sig in restored for sig in absent), "HashedRowSet 的 digests() 经清单打包后 add_digest 还原一致")
+    with tempfile.TemporaryDirectory() as tmp:
+        expected_cells = cells(merge(tmp, "full.xlsx", FILES))
+        for first, then in (({'compact_dedup': True}, {}), ({}, {'compact_dedup': True})):
+            out = merge(tmp, f"compact_{bool(first)}.xlsx", FILES[:2], **first)
+            merge(tmp, None, FILES, append_to=out, **then)
+            check(cells(out) == expected_cells,
+                  f"先{'紧凑' if first else '普通'}去重合并前两个文件，再{'紧凑' if then else '普通'}去重追加全部，与一次合并一致")
+
+
+def run_cli(*args):
+    return subprocess.run([sys.executable, "-m", "ordermerge", "merge", *args], cwd=ROOT,
+                          capture_output=True, text=True, encoding='utf-8')
+
+
+def check_cli():
+    with tempfile.TemporaryDirectory() as tmp:
+        expected = cells(merge(tmp, "full.xlsx", FILES))
+        out_dir = os.path.join(tmp, "cli")
+        result = run_cli("-j", "2", "--no-cache", "-q", "-o", out_dir, *FILES)
+        lines = result.stdout.splitlines()
+        check(result.returncode == 0 and len(lines) == 1 and os.path.isfile(lines[0]) and cells(lines[0]) == expected,
+              "命令行 -j 2 合并：退出码 0，标准输出只有结果文件路径，输出与 MergeJob 一致")
+        result = run_cli("-o", out_dir, os.path.join(tmp, "missing.xlsx"))
+        check(result.returncode == 2 and not result.stdout and "找不到文件" in result.stderr, "命令行输入文件不存在时退出码 2")
+        empty = os.path.join(tmp, "empty.csv")
+        open(empty, 'w').close()
+        empty_dir = os.path.join(tmp, "empty")
+        result = run_cli("-j", "2", "--no-cache", "-o", empty_dir, empty)
+        check(result.returncode == 1 and not result.stdout and "没有可写入的明细" in result.stderr
+              and not os.listdir(empty_dir), "命令行没有可写入的明细时退出码 1，不生成输出文件")
+
+
+if __name__ == "__main__":
+    check_sections()
+    check_streaming()
+    check_outputs()
+    check_dedup_index()
+    check_hashed_row_set()
+    check_cli()
+    print(f"{len(failures)} 项不一致" if failures else "全部一致")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+"""工单汇总的核心包，不依赖 Qt：
+- parser：读取 Excel/CSV 并切出工单区块（OrderProcessor）
+- writer：写出带格式的汇总表
+- dedup：去重集合
+- engine：完整的合并流程（MergeJob、merge）
+- cli：命令行入口（python -m ordermerge）
+- gui：PySide6 图形界面，只有它导入 Qt
+
+from ordermerge import merge 即可在其它程序中调用。pandas / openpyxl 在第一次用到 merge 等名字时才导入，
+只导入 ordermerge.config 的图形界面启动时不必加载它们"""
+
+_LAZY = {'merge': 'engine', 'MergeJob': 'engine', 'OrderProcessor': 'parser'}
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        import importlib
+        return getattr(importlib.import_module(f"ordermerge.{_LAZY[name]}"), name)
+    raise AttributeError(f"module 'ordermerge' has no attribute {name!r}")
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""命令行入口，不导入 Qt，适合服务器批处理与定时任务
+
+用法：python -m ordermerge merge --out 目录 文件或目录或通配符 ...
+"""
+import argparse
+import glob
+import os
+import sys
+
+from ordermerge.config import PARSE_WORKERS, DEDUP_INDEX_PATH
+
+INPUT_EXTENSIONS = ('.xls', '.xlsx', '.csv')  # 与图形界面“添加文件”对话框的过滤条件一致
+
+
+def expand_inputs(patterns, recursive=False):
+    """把命令行参数展开成文件列表：目录取其中的 Excel/CSV，含通配符的按 glob 展开（Windows 的 cmd 不会替我们展开），
+    其余原样当作文件。按参数顺序输出，重复的文件只保留第一次出现"""
+    files, seen = [], set()
+
+    def add(path):
+        key = os.path.normcase(os.path.abspath(path))
+        if key not in seen:
+            seen.add(key)
+            files.append(path)
+
+    for p in patterns:
+        if os.path.isdir(p):
+            found = glob.glob(os.path.join(glob.escape(p), '**' if recursive else '', '*'), recursive=recursive)
+            for f in sorted(found):
+                if os.path.isfile(f) and f.lower().endswith(INPUT_EXTENSIONS): add(f)
+        elif glob.has_magic(p):
+            for f in sorted(glob.glob(p, recursive=True)):
+                if os.path.isfile(f): add(f)
+        else:
+            add(p)
+    return files
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m ordermerge", description="工单汇总（命令行版）")
+    sub = parser.add_subparsers(dest="command", required=True)
+    m = sub.add_parser("merge", help="合并若干 Excel/CSV 文件为一份汇总表")
+    m.add_argument("inputs", nargs="+", help="输入文件、目录或通配符（如 'data/**/*.xlsx'）")
+    m.add_argument("--out", "-o", default=".", help="输出目录，默认当前目录")
+    m.add_argument("--recursive", "-r", action="store_true", help="目录参数包含子目录中的文件")
+    m.add_argument("--workers", "-j", type=int, default=PARSE_WORKERS, help="解析进程数，0 表示按 CPU 核数")
+    m.add_argument("--low-memory", action="store_true", help="低内存输出（超大合并）")
+    m.add_argument("--no-cache", action="store_true", help="不读写解析缓存")
+    m.add_argument("--append", metavar="FILE", help="追加到这个已有的汇总文件")
+    m.add_argument("--dedup-index", nargs="?", const=DEDUP_INDEX_PATH, metavar="PATH",
+                   help=f"跨批次去重，不指定路径时使用 {DEDUP_INDEX_PATH}")
+    m.add_argument("--compact-dedup", action="store_true", help="紧凑去重（千万行级）")
+    m.add_argument("--quiet", "-q", action="store_true", help="只输出结果文件路径")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    files = expand_inputs(args.inputs, args.recursive)
+    missing = [f for f in files if not os.path.isfile(f)]
+    if missing:
+        print(f"找不到文件：{', '.join(missing)}", file=sys.stderr)
+        return 2
+    if not files:
+        print("没有找到可合并的文件", file=sys.stderr)
+        return 2
+    os.makedirs(args.out, exist_ok=True)
+    # 放到参数检查之后导入，--help 与参数错误不必等 pandas 加载
+    from ordermerge.engine import MergeJob
+
+    def log(text):
+        if not args.quiet: print(text, file=sys.stderr)
+
+    def progress(percent, name, position):
+        log(f"[{percent:3d}%] {name}")
+
+    job = MergeJob(files, args.out, args.workers, args.low_memory, not args.no_cache, args.append,
+                   args.dedup_index, args.compact_dedup, log=log, progress=progress)
+    try:
+        out = job.run()
+    except KeyboardInterrupt:
+        return 130
+    except Exception as e:
+        print(f"❌ 错误：{str(e)}", file=sys.stderr)
+        return 1
+    if not out:
+        print("没有可写入的明细，未生成输出文件", file=sys.stderr)
+        return 1
+    print(out)
+    return 0
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""可调参数与默认路径。只依赖标准库，图形界面启动时导入它而不必加载 pandas / openpyxl"""
+import os
+
+OUTPUT_FILENAME_PREFIX = "合并工单_"
+UNIT_MAP = {
+    "個": "个", "個/pcs": "个", "臺": "台", "臺/台": "台",
+    "公斤": "kg", "千克": "kg", "g": "g", "公斤/公斤": "kg"
+}
+UNIT_CACHE_SIZE = 65536  # 单位统一时最多记住多少种不在 UNIT_MAP 中的写法
+STREAM_CHUNK_ROWS = 5000  # 流式读取时每批送入解析器的行数
+CSV_ENCODINGS = ['utf-8', 'gbk', 'gb18030']
+ENCODING_SAMPLE_BYTES = 64 * 1024  # 探测编码时读取文件头、尾各这么多字节
+PARSE_WORKERS = 0  # 解析进程数，0 表示按 CPU 核数自动决定
+PIPELINE_DEPTH = 2  # 每个解析进程最多领先写入几个文件，超出后解析暂停等待写入
+CSV_CHUNK_BYTES = 8 * 1024 * 1024  # CSV 流式读取时每块的大致字节数
+# 与 pandas.read_csv/read_excel 默认识别为空值的写法保持一致，保证流式读取与整表读取结果相同
+CSV_NA_VALUES = ['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+                 '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null']
+APP_DATA_DIR = os.path.join(os.path.expanduser("~"), ".ordermerge")
+UNIT_MAP_PATH = os.path.join(APP_DATA_DIR, "units.json")  # 用户补充的单位写法，JSON 对象：写法 -> 统一后的单位
+PARSE_CACHE_DIR = os.path.join(APP_DATA_DIR, "parse_cache")
+PARSE_CACHE_MAX_BYTES = 512 * 1024 * 1024  # 解析缓存总大小上限，超出后按最近使用时间淘汰
+PARSER_VERSION = 4  # 解析规则或区块结构有变化时加一，旧缓存自动失效
+HEADER_TEMPLATES_PATH = os.path.join(APP_DATA_DIR, "header_templates.json")  # 已识别过的表头模板
+HEADER_TEMPLATE_MAX = 1024  # 最多记住多少种表头模板
+MANIFEST_VERSION = 3  # 增量合并清单格式版本
+DEDUP_INDEX_PATH = os.path.join(APP_DATA_DIR, "dedup.sqlite3")  # 跨批次去重索引的默认位置
+DEDUP_CACHE_ORDERS = 4096  # 去重索引在内存中最多保留多少个单号的签名
+DEDUP_EXPECTED_ROWS = 10_000_000  # 紧凑去重按这个行数设计 Bloom 过滤器大小（1% 假阳性约 12MB）
+DEDUP_HASH_BITS = 64  # 紧凑去重每个签名保存的摘要位数，64 或 128
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""去重集合：跨批次持久化的 DedupIndex 与超大合并用的紧凑 HashedRowSet，用法都与普通 set 相同"""
+import os
+import sys
+import math
+import base64
+import sqlite3
+import hashlib
+from collections import OrderedDict
+import numpy as np
+from ordermerge.config import DEDUP_INDEX_PATH, DEDUP_CACHE_ORDERS, DEDUP_EXPECTED_ROWS, DEDUP_HASH_BITS
+
+
+def row_digest(sig, digest_size=DEDUP_HASH_BITS // 8):
+    """签名的 blake2b 摘要，HashedRowSet 与增量合并清单共用"""
+    return hashlib.blake2b('\x1f'.join(map(str, sig)).encode('utf-8'), digest_size=digest_size).digest()
+
+
+def pack_digests(digests):
+    """定长摘要拼接后 base64 编码，写进 JSON 清单；每个签名约 11 个字符"""
+    return base64.b64encode(b''.join(digests)).decode('ascii')
+
+
+def unpack_digests(text, digest_size=DEDUP_HASH_BITS // 8):
+    data = base64.b64decode(text)
+    return [data[i:i + digest_size] for i in range(0, len(data), digest_size)]
+
+
+# ============================
+# 跨批次去重索引：DedupIndex
+# ============================
+class DedupIndex:
+    """持久化的去重索引，用法与 seen_rows 集合相同（in / add），签名为 (单号, 品名, 规格/图号, 数量)。
+    存在 SQLite 文件里一张以签名为主键的 WITHOUT ROWID 表，主键本身就是覆盖索引，文件可以放在共享目录供多台机器共用。
+    查询按单号进行：第一次遇到某个单号时用一次主键前缀查询取出该单全部签名，之后同一单号的判断都是内存集合查找；
+    内存中只保留最近用到的 DEDUP_CACHE_ORDERS 个单号，不会载入全部历史。
+    合并过程中只读不写：新签名先记在内存里，commit() 时在一个短事务里一次写入并提交，
+    不会整个合并期间占着写锁让别的机器报 database is locked；合并中途失败时 close() 丢弃，
+    不会出现“记为已合并但没写进输出”的行"""
+
+    def __init__(self, path=DEDUP_INDEX_PATH):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS seen (order_no TEXT, name TEXT, spec TEXT, qty TEXT, "
+                          "PRIMARY KEY (order_no, name, spec, qty)) WITHOUT ROWID")
+        self._orders = OrderedDict()  # 单号 -> 库中该单已有的 (品名, 规格/图号, 数量)
+        self._pending = {}  # 单号 -> 本次新增、尚未写库的 (品名, 规格/图号, 数量)
+
+    def _order(self, order_no):
+        rows = self._orders.get(order_no)
+        if rows is not None:
+            self._orders.move_to_end(order_no)
+            return rows
+        # 只有 SELECT，不会开启隐式事务，查询结束即释放共享锁
+        rows = set(self.conn.execute("SELECT name, spec, qty FROM seen WHERE order_no = ?", (order_no,)))
+        self._orders[order_no] = rows
+        if len(self._orders) > DEDUP_CACHE_ORDERS: self._orders.popitem(last=False)
+        return rows
+
+    def __contains__(self, sig):
+        rest = tuple(sig[1:])
+        return rest in self._pending.get(sig[0], ()) or rest in self._order(sig[0])
+
+    def add(self, sig):
+        if sig not in self:
+            self._pending.setdefault(sig[0], set()).add(tuple(sig[1:]))
+
+    def update(self, sigs):
+        for sig in sigs: self.add(sig)
+
+    def commit(self):
+        if not self._pending: return
+        with self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO seen VALUES (?, ?, ?, ?)",
+                                  ((order_no, *rest) for order_no, rows in self._pending.items() for rest in rows))
+        # 已提交的签名并入缓存中的单号，之后的查询不必再回库
+        for order_no, rows in self._pending.items():
+            if order_no in self._orders: self._orders[order_no] |= rows
+        self._pending = {}
+
+    def close(self):
+        self.conn.close()
+
+
+class HashedRowSet:
+    """超大合并用的紧凑去重集合，用法与 seen_rows 集合相同（in / add），每个签名只占 hash_bits 位。
+    签名的 blake2b 摘要放在有序的定长 bytes 数组里二分查找；新摘要先进一个小集合，攒够后批量并入数组。
+    查找前先查 Bloom 过滤器，判定“一定没见过”（新行的常见情况）时直接返回，只有可能命中时才查摘要。
+    摘要相同即视为重复，两种误判的概率由 stats() 给出。expected_rows 只决定 Bloom 过滤器大小，
+    实际行数超出后假阳性率上升、速度变慢，但去重结果不受影响"""
+
+    def __init__(self, expected_rows=DEDUP_EXPECTED_ROWS, hash_bits=DEDUP_HASH_BITS, bloom_fp_rate=0.01):
+        self.digest_size = hash_bits // 8
+        self.n_bits = max(64, int(-expected_rows * math.log(bloom_fp_rate) / math.log(2) ** 2))
+        self.n_hashes = max(1, round(self.n_bits / expected_rows * math.log(2)))
+        self.bloom = bytearray((self.n_bits + 7) // 8)
+        self.table = np.empty(0, dtype=f'S{self.digest_size}')
+        self.pending = set()
+        self.count = 0
+        self._last = (None, None)
+
+    def _digest(self, sig):
+        if self._last[0] is sig: return self._last[1]  # run() 中 in 之后紧接着 add 同一个签名
+        d = row_digest(sig, self.digest_size)
+        self._last = (sig, d)
+        return d
+
+    def _bloom_positions(self, d):
+        h = int.from_bytes(d, 'little')
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        return [(h1 + i * h2) % self.n_bits for i in range(self.n_hashes)]
+
+    def _in_table(self, d):
+        i = np.searchsorted(self.table, d)
+        # numpy 的定长 bytes 取出时会去掉末尾的 \x00，比较时同样去掉
+        return i < len(self.table) and self.table[i] == d.rstrip(b'\x00')
+
+    def __contains__(self, sig):
+        return self.has_digest(self._digest(sig))
+
+    def has_digest(self, d):
+        bloom = self.bloom
+        if not all(bloom[p >> 3] & (1 << (p & 7)) for p in self._bloom_positions(d)): return False
+        return d in self.pending or self._in_table(d)
+
+    def add(self, sig):
+        self.add_digest(self._digest(sig))
+
+    def add_digest(self, d):
+        if self.has_digest(d): return
+        for p in self._bloom_positions(d):
+            self.bloom[p >> 3] |= 1 << (p & 7)
+        self.pending.add(d)
+        self.count += 1
+        if len(self.pending) >= max(1 << 16, len(self.table) // 8): self._merge()
+
+    def update(self, sigs):
+        for sig in sigs: self.add(sig)
+
+    def _merge(self):
+        # 两段各自有序，稳定排序（timsort）合并两段有序序列接近线性
+        new = np.sort(np.array(list(self.pending), dtype=self.table.dtype))
+        self.table = np.sort(np.concatenate([self.table, new]), kind='stable')
+        self.pending = set()
+
+    def __len__(self):
+        return self.count
+
+    def digests(self):
+        """全部摘要，供写入增量合并清单；定长数组的 tobytes() 保留了末尾的 \x00"""
+        table = self.table.tobytes()
+        return [table[i:i + self.digest_size] for i in range(0, len(table), self.digest_size)] + list(self.pending)
+
+    def stats(self):
+        """内存占用（字节）、Bloom 过滤器当前假阳性率、不同签名摘要相同的概率（生日界）"""
+        pending_bytes = sys.getsizeof(self.pending) + len(self.pending) * sys.getsizeof(bytes(self.digest_size))
+        fill = 1 - math.exp(-self.n_hashes * self.count / self.n_bits)
+        return {'rows': self.count,
+                'bytes': self.table.nbytes + len(self.bloom) + pending_bytes,
+                'bloom_fp_rate': fill ** self.n_hashes,
+                'collision_prob': min(1.0, self.count ** 2 / 2 ** (self.digest_size * 8 + 1))}
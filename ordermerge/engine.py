@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""合并流程：并行解析、去重、写出与增量合并清单。merge() 是不依赖 Qt 的一次性调用入口"""
+import os
+import time
+import json
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, BrokenExecutor
+from itertools import islice
+from datetime import datetime
+from ordermerge.config import OUTPUT_FILENAME_PREFIX, PARSE_WORKERS, PIPELINE_DEPTH, MANIFEST_VERSION
+from ordermerge.parser import OrderProcessor, ParseCache, parse_file_job
+from ordermerge.writer import WorkbookWriter, StreamingWorkbookWriter
+from ordermerge.dedup import DedupIndex, HashedRowSet, row_digest, pack_digests, unpack_digests
+
+
+# ============================
+# 增量合并：输出文件旁的清单
+# ============================
+def manifest_path(output_path):
+    return output_path + ".manifest.json"
+
+
+def load_manifest(output_path):
+    """读取输出文件对应的清单；清单缺失、损坏或输出文件已不存在时返回 None，调用方改为全新输出"""
+    if not os.path.exists(output_path): return None
+    try:
+        with open(manifest_path(output_path), encoding='utf-8') as f:
+            manifest = json.load(f)
+    except:
+        return None
+    if manifest.get('version') != MANIFEST_VERSION: return None
+    return manifest
+
+
+def save_manifest(output_path, manifest):
+    path = manifest_path(output_path)
+    tmp = path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+# ============================
+# 合并任务 MergeJob
+# ============================
+class MergeJob:
+    """一次合并：解析输入文件、去重、写出汇总表。不依赖 Qt，图形界面的 WorkerThread 与命令行都用它。
+    log(text) 接收日志，progress(百分比, 文件名, 文件在输入列表中的位置) 接收进度；
+    run() 返回输出文件路径，没有任何可写的明细时返回 None，出错时抛出异常"""
+
+    def __init__(self, files, output_dir, workers=PARSE_WORKERS, low_memory=False, use_cache=True,
+                 append_to=None, dedup_index=None, compact_dedup=False, log=None, progress=None, output_name=None):
+        self.files, self.output_dir = files, output_dir
+        self.output_name = output_name  # 为空时按时间戳生成文件名
+        self.append_to = append_to  # 增量合并：追加到这个已有的输出文件
+        self.dedup_index = dedup_index  # 跨批次去重索引文件，为空时只在本次合并内去重
+        self.compact_dedup = compact_dedup  # 本次合并内去重改用 HashedRowSet，适合千万行级别的合并
+        self.log = log or (lambda text: None)
+        self.progress = progress or (lambda percent, name, position: None)
+        self.processor = OrderProcessor()
+        self.workers = workers or os.cpu_count() or 1
+        self.low_memory = low_memory
+        self.use_cache = use_cache
+        self.cache_hits = self.files_parsed = 0
+        self.stage_times = {'解析': 0.0, '等待解析': 0.0, '写入': 0.0, '保存': 0.0}
+        self._abort = False
+
+    def stop(self):
+        self._abort = True
+
+    def file_keys(self, files):
+        """增量合并时先算出各文件的键，与清单比对后跳过已合并过的文件；与解析缓存用同一个键，
+        算好的键随任务交给解析进程，不再重复读文件。读文件时 hashlib 会释放 GIL，用线程并行计算"""
+        cache = ParseCache(salt=self.processor.unit_normalizer.fingerprint)
+
+        def key(f):
+            try:
+                return cache.file_key(f)
+            except OSError:
+                return None
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return dict(zip(files, pool.map(key, files)))
+
+    def iter_parsed(self, files, keys=None):
+        """解析与写入流水线：后台最多预先解析 workers * PIPELINE_DEPTH 个文件，
+        写入端按输入顺序逐个取走结果；写入跟不上时不再提交新文件，内存占用保持平稳。
+        keys 为 file_keys() 已算好的文件键，逐个产出 (文件, 区块列表, 文件键)。
+        读不了的文件（不存在、损坏、CSV 列数不一致等）记入日志后按没有区块产出，不中断整批合并"""
+        keys = keys or {}
+        workers = min(self.workers, len(files))
+        if workers <= 1:
+            # 单进程时也放到后台线程解析，读文件与写单元格可以交错进行
+            pool = ThreadPoolExecutor(max_workers=1)
+        else:
+            # 统一用 spawn：与 Windows / PyInstaller 打包后的行为一致，也避免 fork 时带上 Qt 的线程状态
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        todo = iter(files)
+        salt = self.processor.unit_normalizer.fingerprint
+        pending = deque((f, pool.submit(parse_file_job, f, self.use_cache, keys.get(f), salt))
+                        for f in islice(todo, workers * PIPELINE_DEPTH))
+        try:
+            while pending:
+                fpath, future = pending.popleft()
+                t0 = time.perf_counter()
+                try:
+                    sections, parse_cost, cache_hit, key = future.result()
+                except BrokenExecutor:
+                    raise
+                except Exception as e:
+                    # 文件键为 None，清单中不记录这个文件，下次追加时会重新尝试
+                    self.log(f"⚠️ 跳过 {os.path.basename(fpath)}：{e}")
+                    sections, key = [], None
+                else:
+                    self.stage_times['解析'] += parse_cost
+                    self.cache_hits += cache_hit
+                    self.files_parsed += 1
+                self.stage_times['等待解析'] += time.perf_counter() - t0
+                nxt = next(todo, None)
+                if nxt is not None:
+                    pending.append((nxt, pool.submit(parse_file_job, nxt, self.use_cache, keys.get(nxt), salt)))
+                yield fpath, sections, key
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def run(self):
+        seen_rows = writer = None
+        try:
+            columns = self.processor.standard_columns
+            manifest = load_manifest(self.append_to) if self.append_to else None
+            appending = manifest is not None
+            if self.append_to and not appending:
+                self.log("⚠️ 上次的输出文件或其清单不可用，改为生成新文件")
+            if not appending:
+                manifest = {'version': MANIFEST_VERSION, 'next_row': 2, 'files': {}, 'seen_digests': ''}
+                writer = StreamingWorkbookWriter(columns) if self.low_memory else WorkbookWriter(columns)
+            else:
+                # write_only 工作簿不能打开已有文件，追加时总是用常规写入
+                writer = WorkbookWriter(columns, self.append_to, manifest['next_row'])
+                self.log(f"追加到：{self.append_to}")
+            if self.dedup_index:
+                seen_rows = DedupIndex(self.dedup_index)
+            elif self.compact_dedup:
+                seen_rows = HashedRowSet()
+            else:
+                seen_rows = set()
+            # 清单里只有以前输出过的签名摘要：紧凑去重本身就存摘要，直接并入；其余情况另外按摘要比对
+            prior_digests = set()
+            if isinstance(seen_rows, HashedRowSet):
+                for d in unpack_digests(manifest['seen_digests']): seen_rows.add_digest(d)
+            else:
+                prior_digests = set(unpack_digests(manifest['seen_digests']))
+            # 本次写出的每一行都记下摘要，之后不用去重索引追加时同样不会重复写出；紧凑去重自己就保存着摘要
+            written = None if isinstance(seen_rows, HashedRowSet) else set()
+
+            # 内容未变的文件上次已经合并过，不再解析；全新输出时文件键由解析进程顺带算出
+            file_keys = self.file_keys(self.files) if appending else {}
+            todo = [f for f in self.files if file_keys.get(f) is None or file_keys[f] not in manifest['files']]
+            if len(todo) < len(self.files):
+                self.log(f"跳过 {len(self.files) - len(todo)} 个已合并过的文件")
+            positions = {f: i for i, f in enumerate(self.files)}
+
+            parsed = self.iter_parsed(todo, file_keys)
+            for idx, (fpath, sections, key) in enumerate(parsed):
+                if self._abort: break
+                t_write = time.perf_counter()
+                for section in sections:
+                    rows = []
+                    for row in section['data_rows']:
+                        sig = (section['order_no'], row['品名'], row['规格/图号'], str(row['数量']))
+                        if sig in seen_rows or (prior_digests and row_digest(sig) in prior_digests): continue
+                        seen_rows.add(sig)
+                        rows.append(row)
+                        if written is not None: written.add(row_digest(sig))
+                    writer.write_section(section, rows)
+                if key:
+                    manifest['files'][key] = {'path': os.path.abspath(fpath),
+                                              'orders': [s['order_no'] for s in sections]}
+
+                self.stage_times['写入'] += time.perf_counter() - t_write
+                self.progress(int((idx + 1) / len(todo) * 100), os.path.basename(fpath), positions[fpath])
+            parsed.close()
+            if isinstance(seen_rows, HashedRowSet):
+                st = seen_rows.stats()
+                self.log(f"紧凑去重：{st['rows']} 条签名，占用约 {st['bytes'] / 2 ** 20:.1f}MB，"
+                         f"Bloom 假阳性率 {st['bloom_fp_rate']:.2%}，摘要误判概率 {st['collision_prob']:.1e}")
+            if self.use_cache and self.files_parsed:
+                self.log(f"解析缓存命中 {self.cache_hits}/{self.files_parsed} 个文件"
+                         f"（{self.cache_hits / self.files_parsed:.0%}）")
+
+            if appending and not self.files_parsed:
+                self.log("没有新的或有改动的文件，输出文件保持不变")
+                return self.append_to
+            if not writer.has_data:
+                return None
+            out = self.append_to if appending else os.path.join(
+                self.output_dir,
+                self.output_name or f"{OUTPUT_FILENAME_PREFIX}{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx")
+            t_save = time.perf_counter()
+            # 先写临时文件再替换，追加时中途出错也不会损坏原有的输出
+            tmp = os.path.splitext(out)[0] + ".tmp.xlsx"
+            try:
+                writer.save(tmp)
+                os.replace(tmp, out)
+            finally:
+                if os.path.exists(tmp): os.remove(tmp)
+            manifest['next_row'] = writer.curr_row
+            # 清单只存签名摘要（每行 8 字节）：以前输出过的加上本次写出的，与用哪种去重方式无关
+            digests = seen_rows.digests() if written is None else prior_digests | written
+            manifest['seen_digests'] = pack_digests(digests)
+            save_manifest(out, manifest)
+            if self.dedup_index: seen_rows.commit()
+            self.stage_times['保存'] = time.perf_counter() - t_save
+            self.log("耗时统计：" + "，".join(f"{k} {v:.2f}s" for k, v in self.stage_times.items()))
+            return out
+        finally:
+            if isinstance(seen_rows, DedupIndex): seen_rows.close()
+            if isinstance(writer, StreamingWorkbookWriter): writer.close()
+
+
+def merge(files, output, **options):
+    """合并 files 并写出汇总表，返回输出文件路径；没有可写入的明细时返回 None，出错时抛出异常。
+    output 为已有目录时在其中按时间戳生成文件名，否则当作输出文件路径。其余参数与 MergeJob 相同，例如
+    merge(files, "汇总.xlsx", workers=4, low_memory=True, log=print)"""
+    if os.path.isdir(output):
+        return MergeJob(files, output, **options).run()
+    output_dir = os.path.dirname(os.path.abspath(output))
+    os.makedirs(output_dir, exist_ok=True)
+    return MergeJob(files, output_dir, output_name=os.path.basename(output), **options).run()
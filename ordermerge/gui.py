@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+"""PySide6 图形界面：文件列表、选项与执行日志，合并本身交给后台线程中的 MergeJob"""
+import sys
+import os
+import threading
+from datetime import datetime
+from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
+                               QHBoxLayout, QPushButton, QLabel, QListWidget,
+                               QFileDialog, QProgressBar, QTextEdit, QMessageBox,
+                               QListWidgetItem, QLineEdit, QCheckBox)
+from PySide6.QtCore import QThread, Signal, QSettings, QTimer
+from PySide6.QtGui import QIcon
+# pandas / openpyxl 由 ordermerge.engine 引入，窗口显示之后才在后台预热，开始合并时通常已导入完毕
+from ordermerge.config import PARSE_WORKERS, DEDUP_INDEX_PATH
+
+
+def get_resource_path(relative_path):
+    """获取资源绝对路径，适配 PyInstaller 单文件打包的临时目录"""
+    if hasattr(sys, '_MEIPASS'):
+        return os.path.join(sys._MEIPASS, relative_path)
+    return os.path.join(os.path.abspath("."), relative_path)
+
+
+# ============================
+# 执行线程 WorkerThread
+# ============================
+class WorkerThread(QThread):
+    """在后台线程执行 MergeJob，把日志、进度与结果转成 Qt 信号"""
+    progress_signal = Signal(int, str, int)
+    log_signal = Signal(str)
+    finished_signal = Signal(str, list)
+    stopped_signal = Signal()
+
+    def __init__(self, files, output_dir, workers=PARSE_WORKERS, low_memory=False, use_cache=True,
+                 append_to=None, dedup_index=None, compact_dedup=False):
+        super().__init__()
+        self.files = files
+        self.job_args = (files, output_dir, workers, low_memory, use_cache, append_to, dedup_index, compact_dedup)
+        self.job = None  # 在 run() 中创建，导入 engine 的耗时不落在界面线程上
+        self._abort = False
+
+    def stop(self):
+        self._abort = True
+        if self.job: self.job.stop()
+
+    def run(self):
+        try:
+            from ordermerge.engine import MergeJob
+            self.job = MergeJob(*self.job_args, log=self.log_signal.emit, progress=self.progress_signal.emit)
+            if self._abort: self.job.stop()
+            out = self.job.run()
+        except Exception as e:
+            self.log_signal.emit(f"❌ 错误：{str(e)}")
+            out = None
+        if out:
+            self.finished_signal.emit(out, self.files)
+        else:
+            self.stopped_signal.emit()
+
+
+def prewarm_engine():
+    """后台线程导入 ordermerge.engine（连带 pandas / numpy / openpyxl）；导入失败留给真正合并时报告"""
+    try:
+        import ordermerge.engine  # noqa: F401
+    except Exception:
+        pass
+
+
+# ============================
+# 界面：MainWindow & Style
+# ============================
+STYLE = """
+QMainWindow { background: #F5F6F8; }
+QLabel { font-size: 14px; color: #1C1C1E; }
+QListWidget { border: 1px solid #E6E6EA; border-radius: 8px; background: white; }
+QTextEdit { background: #0F0F10; color: #9EE39A; border-radius: 8px; font-family: 'Consolas'; font-size: 11px; }
+QPushButton#Run { background: #FF9500; color: white; border-radius: 10px; height: 40px; font-weight: 600; font-size: 15px; }
+QPushButton#Run:disabled { background: #D9D9DC; color: #888888; }
+QPushButton#Action { background: white; border: 1px solid #E6E6EA; border-radius: 8px; height: 32px; padding: 0 15px; }
+QProgressBar { background: #ECECF0; border-radius: 6px; height: 12px; text-align: center; font-size: 10px; }
+QProgressBar::chunk { background: #FF9500; border-radius: 6px; }
+"""
+
+
+class FileItemWidget(QWidget):
+    def __init__(self, file_path, remove_callback):
+        super().__init__()
+        self.file_path = file_path
+        h = QHBoxLayout(self)
+        h.setContentsMargins(10, 5, 10, 5)
+        lbl = QLabel(os.path.basename(file_path))
+        btn = QPushButton("移除")
+        btn.setFixedSize(60, 24)
+        btn.setObjectName("Action")
+        btn.clicked.connect(lambda: remove_callback(file_path))
+        h.addWidget(lbl)
+        h.addStretch()
+        h.addWidget(btn)
+
+
+class MainWindow(QMainWindow):
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("工单汇总工具")
+        self.resize(1000, 750)
+        self.setStyleSheet(STYLE)
+        self.settings = QSettings("MySoft", "OrderMerge")
+        self.output_dir = self.settings.value("output_dir", os.path.join(os.path.expanduser("~"), "Desktop"))
+        self.files = []
+        self.init_ui()
+
+    def init_ui(self):
+        w = QWidget()
+        self.setCentralWidget(w)
+        lay = QVBoxLayout(w)
+        lay.setContentsMargins(25, 20, 25, 20)
+        header = QHBoxLayout()
+        header.addWidget(QLabel("待处理文件："))
+        header.addStretch()
+        btn_add = QPushButton("添加 Excel/CSV")
+        btn_add.setObjectName("Action")
+        btn_add.clicked.connect(self.add_files)
+        btn_clear = QPushButton("清空")
+        btn_clear.setObjectName("Action")
+        btn_clear.clicked.connect(self.clear_list)
+        header.addWidget(btn_add)
+        header.addWidget(btn_clear)
+        lay.addLayout(header)
+        lists = QHBoxLayout()
+        self.file_list = QListWidget()
+        lists.addWidget(self.file_list, 3)
+        log_v = QVBoxLayout()
+        log_v.addWidget(QLabel("执行日志："))
+        self.log = QTextEdit()
+        self.log.setReadOnly(True)
+        log_v.addWidget(self.log)
+        lists.addLayout(log_v, 2)
+        lay.addLayout(lists)
+        out_lay = QHBoxLayout()
+        self.output_edit = QLineEdit(self.output_dir)
+        self.output_edit.setReadOnly(True)
+        btn_dir = QPushButton("修改保存位置")
+        btn_dir.setObjectName("Action")
+        btn_dir.clicked.connect(self.choose_output_dir)
+        out_lay.addWidget(QLabel("保存到："))
+        out_lay.addWidget(self.output_edit)
+        out_lay.addWidget(btn_dir)
+        lay.addLayout(out_lay)
+        lay.addSpacing(10)
+        self.pbar = QProgressBar()
+        lay.addWidget(self.pbar)
+        ops = QHBoxLayout()
+        self.btn_run = QPushButton("开始合并任务")
+        self.btn_run.setObjectName("Run")
+        self.btn_run.clicked.connect(self.start_merge)
+        self.btn_stop = QPushButton("终止")
+        self.btn_stop.setObjectName("Action")
+        self.btn_stop.setEnabled(False)
+        self.btn_stop.clicked.connect(self.stop_merge)
+        ops.addWidget(self.btn_run)
+        ops.addWidget(self.btn_stop)
+        self.chk_low_memory = QCheckBox("低内存输出（超大合并）")
+        self.chk_low_memory.setChecked(self.settings.value("low_memory", False, type=bool))
+        self.chk_low_memory.toggled.connect(lambda on: self.settings.setValue("low_memory", on))
+        ops.addWidget(self.chk_low_memory)
+        self.chk_append = QCheckBox("追加到上次输出")
+        self.chk_append.setChecked(self.settings.value("append_mode", False, type=bool))
+        self.chk_append.toggled.connect(lambda on: self.settings.setValue("append_mode", on))
+        self.chk_append.setToolTip("只解析新增或有改动的文件，并追加到上一次生成的汇总文件中")
+        ops.addWidget(self.chk_append)
+        self.chk_dedup = QCheckBox("跨批次去重")
+        self.chk_dedup.setChecked(self.settings.value("dedup_across_runs", False, type=bool))
+        self.chk_dedup.toggled.connect(lambda on: self.settings.setValue("dedup_across_runs", on))
+        self.chk_dedup.setToolTip("以前合并过的明细行不再输出；索引文件位置可在设置项 dedup_index 中改为共享目录")
+        ops.addWidget(self.chk_dedup)
+        self.chk_compact_dedup = QCheckBox("紧凑去重（千万行级）")
+        self.chk_compact_dedup.setChecked(self.settings.value("compact_dedup", False, type=bool))
+        self.chk_compact_dedup.toggled.connect(lambda on: self.settings.setValue("compact_dedup", on))
+        self.chk_compact_dedup.setToolTip("本次合并内去重只保存签名摘要，内存约为原来的几十分之一；"
+                                          "极小概率把不同的行误判为重复，概率见执行日志")
+        ops.addWidget(self.chk_compact_dedup)
+        ops.addStretch()
+        lay.addLayout(ops)
+
+    def add_files(self):
+        paths, _ = QFileDialog.getOpenFileNames(self, "选择文件", "", "Excel/CSV (*.xls *.xlsx *.csv)")
+        for p in paths:
+            if p not in self.files:
+                self.files.append(p)
+                item = QListWidgetItem(self.file_list)
+                widget = FileItemWidget(p, self.remove_file)
+                item.setSizeHint(widget.sizeHint())
+                self.file_list.setItemWidget(item, widget)
+
+    def remove_file(self, path):
+        if path in self.files: self.files.remove(path)
+        for i in range(self.file_list.count()):
+            w = self.file_list.itemWidget(self.file_list.item(i))
+            if w and w.file_path == path:
+                self.file_list.takeItem(i)
+                break
+
+    def clear_list(self):
+        self.files = []
+        self.file_list.clear()
+
+    def choose_output_dir(self):
+        d = QFileDialog.getExistingDirectory(self, "选择目录", self.output_dir)
+        if d:
+            self.output_dir = d
+            self.output_edit.setText(d)
+            self.settings.setValue("output_dir", d)
+
+    def start_merge(self):
+        if not self.files: return
+        self.log.clear()
+        self.pbar.setValue(0)
+        self.btn_run.setEnabled(False)
+        self.btn_stop.setEnabled(True)
+        self.worker = WorkerThread(self.files, self.output_dir,
+                                   self.settings.value("parse_workers", PARSE_WORKERS, type=int),
+                                   self.chk_low_memory.isChecked(),
+                                   self.settings.value("parse_cache", True, type=bool),
+                                   self.settings.value("last_output", "") if self.chk_append.isChecked() else None,
+                                   self.settings.value("dedup_index", DEDUP_INDEX_PATH)
+                                   if self.chk_dedup.isChecked() else None,
+                                   self.chk_compact_dedup.isChecked())
+        self.worker.progress_signal.connect(lambda v, n, i: (self.pbar.setValue(v), self.file_list.setCurrentRow(i)))
+        self.worker.log_signal.connect(lambda t: self.log.append(f"[{datetime.now().strftime('%H:%M:%S')}] {t}"))
+        self.worker.finished_signal.connect(self.on_finished)
+        self.worker.stopped_signal.connect(self.on_stopped)
+        self.worker.start()
+
+    def stop_merge(self):
+        if hasattr(self, 'worker'): self.worker.stop()
+
+    def on_finished(self, path, logs):
+        self.settings.setValue("last_output", path)
+        QMessageBox.information(self, "完成", f"任务已完成！\n保存至：{path}")
+        self.reset_ui()
+        os.startfile(os.path.dirname(path))
+
+    def on_stopped(self):
+        self.reset_ui()
+
+    def reset_ui(self):
+        self.btn_run.setEnabled(True)
+        self.btn_stop.setEnabled(False)
+
+
+def main():
+    """创建 QApplication 并显示主窗口，返回事件循环的退出码"""
+    app = QApplication(sys.argv)
+    app.setWindowIcon(QIcon(get_resource_path("app.ico")))
+    font = app.font()
+    font.setFamily("Microsoft YaHei")
+    font.setPointSize(10)
+    app.setFont(font)
+    win = MainWindow()
+    win.show()
+    # 等窗口画出来之后再开始导入，导入期间界面可以照常操作
+    QTimer.singleShot(0, lambda: threading.Thread(target=prewarm_engine, daemon=True).start())
+    return app.exec()
@@ -0,0 +1,828 @@
+# -*- coding: utf-8 -*-
+"""解析：读取 Excel/CSV（多种后端、流式分块）、识别表头与单号、切出工单区块，以及解析结果的磁盘缓存"""
+import os
+import re
+import io
+import mmap
+import time
+import codecs
+import importlib.util
+import json
+import pickle
+import hashlib
+import warnings
+from collections import deque
+import numpy as np
+import pandas as pd
+from datetime import datetime, date
+from ordermerge.config import (UNIT_MAP, UNIT_MAP_PATH, UNIT_CACHE_SIZE, STREAM_CHUNK_ROWS, CSV_ENCODINGS, ENCODING_SAMPLE_BYTES, CSV_CHUNK_BYTES,
+                               CSV_NA_VALUES, PARSE_CACHE_DIR, PARSE_CACHE_MAX_BYTES, PARSER_VERSION,
+                               HEADER_TEMPLATES_PATH, HEADER_TEMPLATE_MAX)
+
+
+# ============================
+# 工具函数
+# ============================
+NA_STRINGS = frozenset(CSV_NA_VALUES)
+
+
+def cell_to_str(v):
+    if v is None: return ""
+    if isinstance(v, float) and v.is_integer(): return str(int(v))
+    if isinstance(v, date) and not isinstance(v, datetime): v = datetime(v.year, v.month, v.day)
+    # read_excel 把 "N/A"、"null" 这类写法当作空值，流式读取也要一样，否则去重签名会不同
+    s = str(v)
+    return "" if s in NA_STRINGS else s
+
+
+_csv_encoding_cache = {}
+
+
+def sniff_encoding(file_path):
+    """只读文件头尾各一小段判断 CSV 编码：先看 BOM，再按 CSV_ENCODINGS 顺序严格试解码。
+    结果按 (路径, 大小, 修改时间) 缓存，文件不变就不再重复探测"""
+    st = os.stat(file_path)
+    key = (os.path.abspath(file_path), st.st_size, st.st_mtime_ns)
+    if key in _csv_encoding_cache: return _csv_encoding_cache[key]
+
+    with open(file_path, 'rb') as f:
+        head = f.read(ENCODING_SAMPLE_BYTES)
+        tail = b''
+        if st.st_size > 2 * ENCODING_SAMPLE_BYTES:
+            f.seek(-ENCODING_SAMPLE_BYTES, os.SEEK_END)
+            tail = f.read()
+            # 从换行之后开始解码，避免从半个多字节字符切入（GBK/UTF-8 的尾字节都不会是 0x0A）
+            tail = tail[tail.find(b'\n') + 1:]
+
+    if head.startswith(codecs.BOM_UTF8):
+        encoding = 'utf-8-sig'
+    elif head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        encoding = 'utf-16'
+    else:
+        encoding = CSV_ENCODINGS[-1]
+        for enc in CSV_ENCODINGS:
+            try:
+                # 样本末尾可能截断在多字节字符中间，用增量解码器且不做 final 校验
+                codecs.getincrementaldecoder(enc)().decode(head, final=len(head) == st.st_size)
+                codecs.getincrementaldecoder(enc)().decode(tail, final=True)
+                encoding = enc
+                break
+            except UnicodeDecodeError:
+                continue
+    remember_encoding(key, encoding)
+    return encoding
+
+
+def remember_encoding(key, encoding):
+    if len(_csv_encoding_cache) >= 1024:
+        _csv_encoding_cache.pop(next(iter(_csv_encoding_cache)))
+    _csv_encoding_cache[key] = encoding
+
+
+def safe_float(x):
+    try:
+        if x is None or str(x).strip() == '': return 0.0
+        s = str(x).strip().replace(",", "")
+        return float(s)
+    except:
+        return 0.0
+
+
+def to_float_array(values):
+    """按 safe_float 的规则把一列单元格整体转成 float64 数组。数量、单价列里反复出现的是同一批写法，
+    先去重再逐个转换，空白与无法识别的写法每种只转换一次，不会每行都走一遍异常分支"""
+    values = np.asarray(values, dtype=object)
+    codes, uniques = pd.factorize(values)
+    out = np.array([safe_float(u) for u in uniques], dtype=np.float64)[codes]
+    # factorize 把 None 与 nan 都归为缺失值（编号 -1），两者在 safe_float 中结果不同，单独转换
+    missing = np.flatnonzero(codes == -1)
+    if len(missing): out[missing] = [safe_float(v) for v in values[missing]]
+    return out
+
+
+def round2(values):
+    """与逐个 round(x, 2) 结果相同的向量化版本。np.round 是先乘 100 再取整，
+    乘积恰好落在 .5 附近（或数值大到乘法误差超过判断精度）时取整方向可能不同，这些值改用内置 round 重算"""
+    out = np.round(values, 2)
+    scaled = np.abs(values * 100)
+    with np.errstate(invalid='ignore'):
+        # 用 ~(a > b) 的写法，nan / inf 也归入重算
+        suspect = np.flatnonzero(~(np.abs(scaled % 1 - 0.5) > 1e-6) | ~(scaled < 1e9))
+    if len(suspect): out[suspect] = [round(v, 2) for v in values[suspect].tolist()]
+    return out
+
+
+def int_if_whole(values):
+    """float64 数组转成列表，整数值写成 int，其余保持 float，与 int(q) if q.is_integer() else q 相同"""
+    out = values.astype(object)
+    whole = np.flatnonzero(np.isfinite(values) & (values == np.floor(values)))
+    if len(whole):
+        # int64 放不下的整数交给 Python int 转换，结果与 int(q) 一致
+        fits = np.abs(values[whole]) < 2 ** 62
+        out[whole[fits]] = values[whole[fits]].astype(np.int64).tolist()
+        out[whole[~fits]] = [int(v) for v in values[whole[~fits]].tolist()]
+    return out.tolist()
+
+
+# ============================
+# Excel 读取后端
+# ============================
+def iter_rows_openpyxl(file_path):
+    from openpyxl import load_workbook
+    wb = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        for row in wb.worksheets[0].iter_rows(values_only=True):
+            yield row
+    finally:
+        wb.close()
+
+
+def iter_rows_calamine(file_path):
+    from python_calamine import CalamineWorkbook
+    wb = CalamineWorkbook.from_path(file_path)
+    try:
+        sheet = wb.get_sheet_by_index(0)
+        # iter_rows 不包含数据区左侧的空列，补齐后列号才与其它后端一致
+        lead = [None] * sheet.start[1] if sheet.start else []
+        for row in sheet.iter_rows():
+            yield lead + row
+    finally:
+        wb.close()
+
+
+def iter_rows_xlrd(file_path):
+    import xlrd
+    wb = xlrd.open_workbook(file_path, on_demand=True)
+    try:
+        sheet = wb.sheet_by_index(0)
+        for r in range(sheet.nrows):
+            row = []
+            for cell in sheet.row(r):
+                if cell.ctype == xlrd.XL_CELL_DATE:
+                    row.append(xlrd.xldate.xldate_as_datetime(cell.value, wb.datemode))
+                elif cell.ctype in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK, xlrd.XL_CELL_ERROR):
+                    row.append(None)
+                else:
+                    row.append(cell.value)
+            yield row
+    finally:
+        wb.release_resources()
+
+
+# 读取后端注册表：名称 -> (依赖模块, 逐行读取函数)
+EXCEL_ENGINES = {
+    'calamine': ('python_calamine', iter_rows_calamine),
+    'openpyxl': ('openpyxl', iter_rows_openpyxl),
+    'xlrd': ('xlrd', iter_rows_xlrd),
+}
+# 各扩展名可用的后端，按速度从快到慢排列
+ENGINE_PREFERENCE = {
+    '.xlsx': ['calamine', 'openpyxl'],
+    '.xlsm': ['calamine', 'openpyxl'],
+    '.xls': ['calamine', 'xlrd'],
+    '.xlsb': ['calamine'],
+    '.ods': ['calamine'],
+}
+_module_installed = {}
+
+
+def module_installed(module):
+    if module not in _module_installed:
+        _module_installed[module] = importlib.util.find_spec(module) is not None
+    return _module_installed[module]
+
+
+def engine_installed(name):
+    return module_installed(EXCEL_ENGINES[name][0])
+
+
+def pick_engines(file_path, preferred=None):
+    """返回能读取该文件且已安装的后端，按速度排序；指定 preferred 时把它排在最前"""
+    names = ENGINE_PREFERENCE.get(os.path.splitext(file_path)[1].lower(), [])
+    if preferred in names: names = [preferred] + [n for n in names if n != preferred]
+    return [n for n in names if engine_installed(n)]
+
+
+# ============================
+# CSV 分块读取
+# ============================
+def iter_csv_chunks(file_path, chunk_bytes):
+    """内存映射整个文件，在换行处切成约 chunk_bytes 大小的字节块；引号内的换行不会被切开"""
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0: return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            size, start = len(mm), 0
+            while start < size:
+                pos = min(start + chunk_bytes, size)
+                quotes = mm[start:pos].count(b'"')
+                while pos < size:
+                    nl = mm.find(b'\n', pos)
+                    if nl == -1:
+                        pos = size
+                        break
+                    quotes += mm[pos:nl + 1].count(b'"')
+                    pos = nl + 1
+                    if quotes % 2 == 0: break
+                yield mm[start:pos]
+                start = pos
+
+
+def iter_csv_mmap(file_path, encoding, chunk_bytes):
+    """列数与整表 read_csv 相同，由文件第一行决定，之后每块都按这个列数读取：
+    块首恰好是“小计,100”这样的短行时也不会把列数定小，短行照常在右侧补空。
+    比第一行宽的行整表 read_csv 会报错，这里同样报错：index_col=False 让 pandas 不把多出的前几列当作索引，
+    多出的列只会被截掉并给出 ParserWarning，把它当作错误抛出"""
+    names = None
+    for chunk in iter_csv_chunks(file_path, chunk_bytes):
+        df = None
+        # 每块单独解码，样本之外出现的异常字节只影响这一块的编码选择
+        for enc in [encoding] + [e for e in CSV_ENCODINGS if e != encoding]:
+            try:
+                with warnings.catch_warnings():
+                    warnings.simplefilter('error', pd.errors.ParserWarning)
+                    df = pd.read_csv(io.BytesIO(chunk), header=None, names=names, index_col=False,
+                                     encoding=enc, dtype=str)
+                break
+            except UnicodeDecodeError:
+                continue
+            except pd.errors.ParserWarning as e:
+                raise ValueError(f"CSV 中有比第一行更宽的行：{file_path}") from e
+        if df is None: raise ValueError(f"无法识别编码：{file_path}")
+        if names is None: names = list(range(df.shape[1]))
+        yield df.fillna("")
+
+
+def iter_csv_arrow(file_path, encoding, chunk_bytes):
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+    read_opts = pa_csv.ReadOptions(autogenerate_column_names=True, encoding=encoding, block_size=chunk_bytes)
+    parse_opts = pa_csv.ParseOptions(newlines_in_values=True)
+    # 先读一块拿到列数，再把所有列都按字符串读取，避免 007 之类的编号被当成数字
+    with pa.memory_map(file_path) as src:
+        n_cols = len(pa_csv.open_csv(src, read_options=read_opts, parse_options=parse_opts).schema)
+    convert_opts = pa_csv.ConvertOptions(column_types={f"f{i}": pa.string() for i in range(n_cols)},
+                                         strings_can_be_null=True, null_values=CSV_NA_VALUES)
+    with pa.memory_map(file_path) as src:
+        for batch in pa_csv.open_csv(src, read_options=read_opts, parse_options=parse_opts,
+                                     convert_options=convert_opts):
+            if batch.num_rows: yield batch.to_pandas().fillna("")
+
+
+class SectionRows:
+    """按列追加的明细缓冲区：逐行 append 只是列表追加，写入时逐行迭代成 dict，缓存时按列存取"""
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self._cols = {c: [] for c in self.columns}
+
+    def append(self, item):
+        for c in self.columns:
+            self._cols[c].append(item.get(c, ''))
+
+    def __len__(self):
+        return len(self._cols[self.columns[0]]) if self.columns else 0
+
+    @property
+    def empty(self):
+        return len(self) == 0
+
+    def extend(self, cols, n):
+        """按列批量追加 n 行，缺失的列补空字符串"""
+        for c in self.columns:
+            self._cols[c].extend(cols[c] if c in cols else [''] * n)
+
+    def __iter__(self):
+        for values in zip(*(self._cols[c] for c in self.columns)):
+            yield dict(zip(self.columns, values))
+
+    def to_columns(self):
+        return {c: self._cols[c] for c in self.columns}
+
+    @classmethod
+    def from_columns(cls, columns, cols):
+        rows = cls(columns)
+        rows._cols = {c: list(cols[c]) for c in rows.columns}
+        return rows
+
+
+class KeywordMatcher:
+    """多关键字子串匹配（Aho–Corasick 自动机）：对文本扫描一遍，找出其中出现过的全部关键字所属的标签。
+    labels 为 {标签: [关键字, ...]}，不区分大小写；结果按标签在 labels 中的顺序给出。
+    表头单元格在各文件中反复出现，同一文本的结果会缓存，缓存满 cache_size 条后清空重来"""
+
+    def __init__(self, labels, cache_size=4096):
+        self.labels = list(labels)
+        self.goto, self.out = [{}], [0]  # 每个状态的转移表，以及到达该状态时命中的标签（按位）
+        for rank, keywords in enumerate(labels.values()):
+            for kw in keywords:
+                node = 0
+                for ch in kw.lower():
+                    if ch not in self.goto[node]:
+                        self.goto.append({})
+                        self.out.append(0)
+                        self.goto[node][ch] = len(self.goto) - 1
+                    node = self.goto[node][ch]
+                self.out[node] |= 1 << rank
+        # 按层建失败指针，并把后缀状态的命中并入当前状态
+        self.fail = [0] * len(self.goto)
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self.goto[node].items():
+                f = self.fail[node]
+                while f and ch not in self.goto[f]: f = self.fail[f]
+                self.fail[child] = self.goto[f].get(ch, 0)
+                self.out[child] |= self.out[self.fail[child]]
+                queue.append(child)
+        self.cache_size = cache_size
+        self._cache = {}
+
+    def match(self, text):
+        found = self._cache.get(text)
+        if found is not None: return found
+        goto, fail, out = self.goto, self.fail, self.out
+        node = mask = 0
+        for ch in text.lower():
+            while node and ch not in goto[node]: node = fail[node]
+            node = goto[node].get(ch, 0)
+            mask |= out[node]
+        found = tuple(label for rank, label in enumerate(self.labels) if mask >> rank & 1)
+        if len(self._cache) >= self.cache_size: self._cache.clear()
+        self._cache[text] = found
+        return found
+
+
+# ============================
+# 单位统一：UnitNormalizer
+# ============================
+def load_unit_map(path=UNIT_MAP_PATH):
+    """内置 UNIT_MAP 加上用户在 path（JSON 对象：写法 -> 统一后的单位）中补充的写法，用户的写法优先匹配。
+    文件不存在或格式不对时只用内置表"""
+    user = {}
+    try:
+        with open(path, encoding='utf-8') as f:
+            loaded = json.load(f)
+        if isinstance(loaded, dict): user = {str(k): str(v) for k, v in loaded.items() if k}
+    except (OSError, ValueError):
+        pass
+    return {**user, **{k: v for k, v in UNIT_MAP.items() if k not in user}}
+
+
+class UnitNormalizer:
+    """单位统一，规则与逐个子串比较相同：按 unit_map 的顺序，第一个出现在单元格里的写法决定结果。
+    unit_map 中的写法本身预先算好结果放进精确匹配表；其余写法第一次出现时按规则扫描一遍并记住，
+    记住的写法超过 cache_size 种后清空重来。fingerprint 标识这套规则，用于区分解析缓存"""
+
+    def __init__(self, unit_map=UNIT_MAP, cache_size=UNIT_CACHE_SIZE):
+        self.unit_map = dict(unit_map)
+        self.exact = {k: self._scan(k) for k in self.unit_map}
+        self.cache_size = cache_size
+        self._memo = {}
+        self.fingerprint = hashlib.blake2b(json.dumps(list(self.unit_map.items()), ensure_ascii=False).encode(),
+                                           digest_size=8).hexdigest()
+
+    def _scan(self, u):
+        for k, v in self.unit_map.items():
+            if k in u: return v
+        return u
+
+    def __call__(self, u):
+        v = self.exact.get(u)
+        if v is None:
+            v = self._memo.get(u)
+            if v is None:
+                v = self._scan(u)
+                if len(self._memo) >= self.cache_size: self._memo.clear()
+                self._memo[u] = v
+        return v
+
+    def map(self, values):
+        """整列统一：每种写法只查一次，再按编号展开回整列"""
+        codes, uniques = pd.factorize(np.asarray(values, dtype=object), use_na_sentinel=False)
+        return np.array([self(u) for u in uniques], dtype=object)[codes].tolist()
+
+
+# ============================
+# 表头模板缓存：HeaderTemplates
+# ============================
+class HeaderTemplates:
+    """表头模板缓存：表头行指纹 -> header_map。大部分文件出自少数几个供应商模板，表头完全相同，
+    命中后不再逐格匹配关键字；没见过的表头匹配一次后自动记住，超过 max_entries 个时先丢最早记住的。
+    指纹取各格去空白、转小写后拼接的文字（去掉行尾空格，列数不同的同一模板也能命中）。
+    path 不为空时从该 JSON 文件载入，save() 写回；rules（关键字表的指纹）或解析器版本变了，旧文件作废"""
+
+    def __init__(self, rules, path=None, max_entries=HEADER_TEMPLATE_MAX):
+        self.rules, self.path, self.max_entries = rules, path, max_entries
+        self.templates = {}
+        self.dirty = False
+        if path: self.templates = self._read()
+
+    @staticmethod
+    def fingerprint(row_values):
+        # 直接用拼接后的文字作键：字典本身按哈希查找，比先算摘要更快，写回的 JSON 也能看懂是哪种表头
+        return '\x1f'.join(v.strip() for v in row_values).rstrip('\x1f').lower()
+
+    def get(self, fp):
+        h_map = self.templates.get(fp)
+        return dict(h_map) if h_map is not None else None
+
+    def put(self, fp, h_map):
+        self.templates[fp] = dict(h_map)
+        self.dirty = True
+        while len(self.templates) > self.max_entries:
+            self.templates.pop(next(iter(self.templates)))
+
+    def _read(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == PARSER_VERSION and data.get('rules') == self.rules:
+                return {fp: dict(h_map) for fp, h_map in data['templates'].items()}
+        except (OSError, ValueError, KeyError, AttributeError, TypeError):
+            pass
+        return {}
+
+    def save(self):
+        """多个解析进程各自学到新模板：先并入文件中已有的再整体替换，写失败只是下次重新学习"""
+        if not (self.path and self.dirty): return
+        merged = self._read()
+        merged.update(self.templates)
+        self.templates = dict(list(merged.items())[-self.max_entries:])
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({'version': PARSER_VERSION, 'rules': self.rules, 'templates': self.templates}, f,
+                          ensure_ascii=False)
+            os.replace(tmp, self.path)
+            self.dirty = False
+        except OSError:
+            pass
+
+
+# ============================
+# 核心处理类：OrderProcessor
+# ============================
+class OrderProcessor:
+    def __init__(self, template_path=None):
+        """template_path 为表头模板缓存文件，为空时模板只记在内存中"""
+        self.standard_columns = ['序号', '品名', '规格/图号', '单位', '数量', '单价', '金额', '备注/本体单重']
+        self.mapping_keywords = {
+            '品名': ['品名', '物料名称', 'product name', 'material name'],
+            '规格/图号': ['规格', '图号', '物料规格', 'spec', 'specification', '型号'],
+            '单位': ['单位', 'unit', 'uom', '采购单位'],
+            '数量': ['数量', 'qty', 'quantity', '采购数量', '报价数量'],
+            '单价': ['单价', 'price', 'unit price', '报价单价'],
+            '金额': ['金额', 'total', 'amount'],
+            '备注/本体单重': ['备注', 'remarks', '本体单重', 'item no. remarks', '询价说明'],
+            '询价人': ['询价人', 'inquirer'],
+            '代购厂商': ['代购厂商', 'purchasing agent', '代购']
+        }
+        self.order_no_pattern = re.compile(r'XIDP-[A-Z]?\d{10,12}', re.I)
+        self.order_no_group = re.compile(f'({self.order_no_pattern.pattern})', re.I)
+        self.date_pattern = re.compile(r'\d{4}[-/]\d{1,2}[-/]\d{1,2}')
+        self.date_group = re.compile(f'({self.date_pattern.pattern})')
+        # 表头行：同时出现品名类与数量/单价类关键字
+        self.header_name_keywords = ['品名', '物料名称', '规格']
+        self.header_qty_keywords = ['数量', '单价']
+        # mapping_keywords 编译成一个自动机，create_header_map 对每个单元格只扫描一遍；改动关键字后需重新编译
+        self.keyword_matcher = KeywordMatcher(self.mapping_keywords)
+        rules = hashlib.blake2b(json.dumps(self.mapping_keywords, ensure_ascii=False).encode(), digest_size=8)
+        self.header_templates = HeaderTemplates(rules.hexdigest(), template_path)
+        self.streaming = True
+        self.unit_normalizer = UnitNormalizer(load_unit_map())
+        self.excel_engine = None  # None 表示自动选用已安装的最快后端
+        self.chunk_rows = STREAM_CHUNK_ROWS
+        self.csv_chunk_bytes = CSV_CHUNK_BYTES
+
+    def read_excel_smart(self, file_path):
+        """整表读取，单元格都按字符串读出。各种编码、各个后端都读不了时抛出异常（文件不存在时为 OSError），
+        不返回空表：读不了的文件与流式读取一样报错，由合并任务记录后跳过"""
+        error = None
+        if file_path.endswith('.csv'):
+            sniffed = sniff_encoding(file_path)
+            # 样本之外仍可能有解码失败的字节，此时才退回逐个尝试其余编码
+            for enc in [sniffed] + [e for e in CSV_ENCODINGS if e != sniffed]:
+                try:
+                    df = pd.read_csv(file_path, header=None, encoding=enc, dtype=str).fillna("")
+                except UnicodeDecodeError as e:
+                    error = e
+                    continue
+                except pd.errors.EmptyDataError:
+                    return pd.DataFrame()
+                except Exception as e:
+                    error = e
+                    break
+                if enc != sniffed:
+                    st = os.stat(file_path)
+                    remember_encoding((os.path.abspath(file_path), st.st_size, st.st_mtime_ns), enc)
+                return df
+        else:
+            for engine in pick_engines(file_path, self.excel_engine) or [None]:
+                try:
+                    return pd.read_excel(file_path, header=None, dtype=str, engine=engine).fillna("")
+                except Exception as e:
+                    error = e
+        raise ValueError(f"无法读取：{file_path}（{str(error).strip()}）") from error
+
+    def iter_excel_rows(self, file_path):
+        """逐行读取首个工作表，单元格按 read_excel(dtype=str) 的规则转成字符串；
+        按后端优先级依次尝试，某个后端打不开文件或中途出错时换下一个，跳过已经产出的行接着读"""
+        done, error = 0, None
+        for name in pick_engines(file_path, self.excel_engine):
+            seen = 0
+            try:
+                for row in EXCEL_ENGINES[name][1](file_path):
+                    seen += 1
+                    if seen > done:
+                        yield [cell_to_str(v) for v in row]
+                        done = seen
+                return
+            except Exception as e:
+                error = e
+        # 与 read_excel_smart 一致：所有后端都读不了时报错，读到一半时也不能静默丢掉后面的行
+        if done: raise ValueError(f"Excel 第 {done} 行之后无法读取：{file_path}（{str(error).strip()}）") from error
+        raise ValueError(f"无法读取：{file_path}（{str(error).strip()}）") from error
+
+    def iter_frames(self, file_path):
+        """按块产出 DataFrame：Excel、CSV 边读边产出，没有可用的流式读取方式时整表读取后一次产出"""
+        ext = os.path.splitext(file_path)[1].lower()
+        if self.streaming and ext == '.csv' and sniff_encoding(file_path) in CSV_ENCODINGS + ['utf-8-sig']:
+            yield from self.iter_csv_frames(file_path)
+        elif self.streaming and pick_engines(file_path, self.excel_engine):
+            yield from self.iter_excel_frames(file_path)
+        else:
+            df = self.read_excel_smart(file_path)
+            if not df.empty: yield df
+
+    def iter_excel_frames(self, file_path):
+        rows = []
+        for row in self.iter_excel_rows(file_path):
+            rows.append(row)
+            if len(rows) >= self.chunk_rows:
+                yield pd.DataFrame(rows, dtype=str).fillna("")
+                rows = []
+        if rows:
+            yield pd.DataFrame(rows, dtype=str).fillna("")
+
+    def iter_csv_frames(self, file_path):
+        """CSV 分块读取，整个文件不会一次性解码成 Python 字符串：装了 pyarrow 时用它的流式读取器
+        直接读内存映射文件，否则 mmap 后在换行处切块交给 read_csv"""
+        encoding = sniff_encoding(file_path)
+        readers = [iter_csv_arrow, iter_csv_mmap] if module_installed('pyarrow') else [iter_csv_mmap]
+        # 某个读取方式中途失败（如 pyarrow 遇到列数不同的行）时换下一个，跳过已经产出的行接着读
+        done = 0
+        for reader in readers:
+            seen = 0
+            try:
+                for df in reader(file_path, encoding, self.csv_chunk_bytes):
+                    seen += len(df)
+                    if seen > done:
+                        yield df.iloc[len(df) - (seen - done):].reset_index(drop=True)
+                        done = seen
+                return
+            except Exception:
+                continue
+        df = self.read_excel_smart(file_path)  # 整表也读不了时在这里报错，与块大小无关
+        if done and len(df) <= done:
+            # 已经产出了前面的行却读不完整个文件：报错，不能悄悄丢掉后面的数据
+            raise ValueError(f"CSV 第 {done} 行之后无法解析：{file_path}")
+        if len(df) > done: yield df.iloc[done:].reset_index(drop=True)
+
+    def parse_file_to_sections(self, file_path):
+        state = {'sections': [], 'current': None, 'header_map': None, 'global_id': None}
+        for df in self.iter_frames(file_path):
+            self.scan_frame(df, state)
+        self.close_section(state)
+        return state['sections']
+
+    def scan_frame(self, df, state):
+        """对一个数据块（整表或流式读取的一批行）做向量化扫描：
+        先用布尔掩码标出表头行、单号行，再按行号区间批量切出明细。跨块的状态都保存在 state 中"""
+        cells = df.astype(str).apply(lambda col: col.str.strip())
+        if cells.shape[1] > 1:
+            row_text = cells.iloc[:, 0].str.cat([cells.iloc[:, c] for c in range(1, cells.shape[1])], sep=" ")
+        else:
+            row_text = cells.iloc[:, 0]
+
+        found_ids = row_text.str.extract(self.order_no_group, expand=False)
+        has_id = found_ids.notna().to_numpy()
+
+        values = cells.to_numpy(dtype=object)
+        found_ids = found_ids.to_numpy(dtype=object)
+        # 兜底单号取文件中第一个出现的单号；在它之前读到的孤立明细区块此时补上单号
+        if state['global_id'] is None and has_id.any():
+            state['global_id'] = found_ids[has_id][0]
+            if state['current'] and state['current']['order_no'] is None:
+                state['current']['order_no'] = state['global_id']
+        row_text = row_text.to_numpy(dtype=object)
+        n_rows = len(values)
+        is_header = np.zeros(n_rows, dtype=bool)
+        is_header[self.header_rows(row_text)] = True
+        # 单号行上的日期一次性批量提取，循环中新开区块时直接取用
+        id_rows = np.flatnonzero(has_id)
+        dates = dict(zip(id_rows.tolist(), self.extract_dates(values[id_rows])))
+
+        # 只有表头行与单号行会改变状态，两者之间的行全部是同一表头下的明细
+        start = 0
+        for r in np.flatnonzero(is_header | has_id).tolist() + [n_rows]:
+            if state['header_map'] and start < r:
+                self.collect_items(values[start:r], state)
+            if r == n_rows: break
+
+            if is_header[r]:
+                state['header_map'] = self.create_header_map(values[r].tolist())
+                if state['current']: state['current']['header_map'] = state['header_map']
+                start = r + 1
+                continue
+
+            found_id = found_ids[r]
+            if not state['current'] or found_id != state['current']['order_no']:
+                self.close_section(state)
+                state['current'] = {
+                    'order_no': found_id,
+                    'date': dates[r],
+                    'info': "",
+                    'header_map': state['header_map'],
+                    'data_rows': SectionRows(self.standard_columns)
+                }
+            # 单号行本身也按明细行处理
+            start = r
+
+    def extract_dates(self, rows):
+        """rows 为若干行单元格（二维数组），逐格查找 yyyy-mm-dd、yyyy/m/d 写法的日期，按列从左到右取第一个，
+        原样保留，返回每行一个字符串（没有时为空）。逐列匹配，不必把整行拼成一个字符串。
+        Excel 日期单元格由各读取后端按单元格格式转成 datetime，读出来是 2024-01-01 00:00:00，同样能找到；
+        没有日期格式的纯数字不当作日期序列号，以免把图号、数量之类的数字误认成日期"""
+        n_rows = len(rows)
+        if not n_rows or not rows.shape[1]: return [""] * n_rows
+        frame = pd.DataFrame(rows, dtype=object)
+        found = frame.apply(lambda col: col.str.extract(self.date_group, expand=False))
+        return found.bfill(axis=1).iloc[:, 0].fillna("").tolist()
+
+    def header_rows(self, row_text):
+        """表头行（同时出现品名类与数量/单价类关键字）的行号数组。关键字都是普通字符串，用子串判断即可：
+        先找含数量/单价类关键字的行，明细行里很少出现，剩下的候选行再判断品名类。
+        每个数据块都重新判断，表头在文件中途换成另一种模板也能识别"""
+        candidates = np.arange(len(row_text))
+        for keywords in (self.header_qty_keywords, self.header_name_keywords):
+            texts = row_text[candidates]
+            hit = np.zeros(len(candidates), dtype=bool)
+            for kw in keywords:
+                hit |= np.fromiter((kw in t for t in texts), dtype=bool, count=len(texts))
+            candidates = candidates[hit]
+        return candidates
+
+    def close_section(self, state):
+        current = state['current']
+        if current and not current['data_rows'].empty:
+            if current['order_no'] is None: current['order_no'] = "未知单号"
+            state['sections'].append(current)
+        state['current'] = None
+
+    def collect_items(self, block, state):
+        """block 为同一表头下连续的若干行（二维数组），按列批量取值后整体追加到当前区块"""
+        header_map = state['header_map']
+        cols = {k: block[:, idx] for k, idx in header_map.items() if idx < block.shape[1]}
+        p_names = cols.get('品名')
+        if p_names is None: return
+
+        keep = np.flatnonzero((p_names != '') & ~np.isin(p_names, ['品名', '物料名称', 'Material Name', '物料名称(品名)']))
+        if not len(keep): return
+        cols = {k: v[keep] for k, v in cols.items()}
+
+        if not state['current']:
+            # 出现在任何单号行之前的明细：单号可能还在后面的数据块里，先留空，读到后再补
+            state['current'] = {'order_no': state['global_id'], 'date': "", 'info': "", 'header_map': header_map,
+                                'data_rows': SectionRows(self.standard_columns)}
+        current = state['current']
+
+        # 提取询价信息
+        if not current['info']:
+            agent = str(cols['代购厂商'][0]).strip() if '代购厂商' in cols else ''
+            inquirer = str(cols['询价人'][0]).strip() if '询价人' in cols else ''
+            for empty in ['无', '無', 'none', 'null', '-', 'nan']:
+                if agent.lower() == empty: agent = ''
+                if inquirer.lower() == empty: inquirer = ''
+            parts = [p for p in [agent, inquirer] if p]
+            current['info'] = f"{'，'.join(parts)}" if parts else "工单详情"
+
+        if '单位' in cols:
+            cols['单位'] = self.unit_normalizer.map(cols['单位'])
+        qtys = to_float_array(cols['数量']) if '数量' in cols else np.zeros(len(keep))
+        prcs = to_float_array(cols['单价']) if '单价' in cols else np.zeros(len(keep))
+        cols['数量'] = int_if_whole(qtys)
+        cols['单价'] = round2(prcs).tolist()
+        cols['金额'] = round2(qtys * prcs).tolist()
+
+        current['data_rows'].extend(cols, len(keep))
+
+    def create_header_map(self, row_values):
+        fp = self.header_templates.fingerprint(row_values)
+        h_map = self.header_templates.get(fp)
+        if h_map is not None: return h_map
+        h_map = {}
+        for idx, val in enumerate(row_values):
+            for std_key in self.keyword_matcher.match(val):
+                if std_key not in h_map: h_map[std_key] = idx
+        self.header_templates.put(fp, h_map)
+        return h_map
+
+
+# ============================
+# 解析结果磁盘缓存：ParseCache
+# ============================
+class ParseCache:
+    """已解析区块的磁盘缓存，每个文件一条 pickle，文件名由 (解析器版本, 大小, 修改时间, 内容哈希) 算出，
+    内容不变的文件再次合并时直接读缓存。缓存文件的修改时间记录最近一次使用，总大小超过上限时先删最久未用的。
+    多个解析进程可以同时读写：写入先落到临时文件再改名，读取或删除失败都只当作未命中"""
+
+    def __init__(self, cache_dir=PARSE_CACHE_DIR, max_bytes=PARSE_CACHE_MAX_BYTES, salt=''):
+        self.cache_dir, self.max_bytes = cache_dir, max_bytes
+        self.salt = salt  # 影响解析结果的可配置规则（如单位表）的标识，规则变了旧缓存自然不再命中
+
+    def file_key(self, file_path):
+        st = os.stat(file_path)
+        h = hashlib.blake2b(digest_size=16)
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                h.update(block)
+        meta = f"{PARSER_VERSION}|{st.st_size}|{st.st_mtime_ns}|{h.hexdigest()}"
+        if self.salt: meta += f"|{self.salt}"
+        return hashlib.blake2b(meta.encode(), digest_size=16).hexdigest()
+
+    def entry_path(self, key):
+        return os.path.join(self.cache_dir, key + ".pkl")
+
+    def get(self, key):
+        path = self.entry_path(key)
+        try:
+            with open(path, 'rb') as f:
+                stored = pickle.load(f)
+            os.utime(path)
+        except:
+            return None
+        return [dict(s, data_rows=SectionRows.from_columns(*s['data_rows'])) for s in stored]
+
+    def put(self, key, sections):
+        # 只存普通的 dict / list，缓存文件不依赖 SectionRows 所在模块的名字
+        stored = [dict(s, data_rows=(s['data_rows'].columns, s['data_rows'].to_columns())) for s in sections]
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp = f"{self.entry_path(key)}.{os.getpid()}.tmp"
+            with open(tmp, 'wb') as f:
+                pickle.dump(stored, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.entry_path(key))
+            self.evict()
+        except:
+            pass
+
+    def evict(self):
+        entries = []
+        for e in os.scandir(self.cache_dir):
+            if e.name.endswith(".pkl"):
+                try:
+                    st = e.stat()
+                    entries.append((st.st_mtime, st.st_size, e.path))
+                except OSError:
+                    pass
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes: break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+
+_pool_processor = None
+_pool_cache = None
+_pool_use_cache = None
+
+
+def parse_file_job(file_path, use_cache=True, key=None, salt=None):
+    """进程池中执行的解析任务，OrderProcessor 在进程内复用。salt 为调用方载入的单位规则指纹，
+    与复用的 OrderProcessor 不同（units.json 改过）或 use_cache 变了时重新创建，不会用旧单位表解析后存到新键下。
+    key 为调用方已算好的文件键，只在 salt 与本进程一致时采用，否则在这里重新计算；
+    返回 (区块列表, 解析耗时, 是否命中缓存, 文件键)，文件读不了时文件键为 None"""
+    global _pool_processor, _pool_cache, _pool_use_cache
+    if (_pool_processor is None or use_cache != _pool_use_cache
+            or (salt is not None and salt != _pool_cache.salt)):
+        _pool_processor = OrderProcessor(HEADER_TEMPLATES_PATH if use_cache else None)
+        _pool_cache = ParseCache(salt=_pool_processor.unit_normalizer.fingerprint)
+        _pool_use_cache = use_cache
+    t0 = time.perf_counter()
+    if salt != _pool_cache.salt: key = None
+    if key is None:
+        try:
+            key = _pool_cache.file_key(file_path)
+        except OSError:
+            pass
+    sections = _pool_cache.get(key) if key and use_cache else None
+    if sections is not None:
+        return sections, time.perf_counter() - t0, True, key
+    sections = _pool_processor.parse_file_to_sections(file_path)
+    if key and use_cache: _pool_cache.put(key, sections)
+    _pool_processor.header_templates.save()
+    return sections, time.perf_counter() - t0, False, key
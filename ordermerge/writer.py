@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""输出：把去重后的工单区块写成带外框与格式的汇总表，常规与低内存（write_only）两种写入器"""
+from copy import copy
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Border, Side, Alignment, Font
+from openpyxl.styles.cell_style import StyleArray
+
+
+# ============================
+# 输出：StylePalette / WorkbookWriter / StreamingWorkbookWriter
+# ============================
+class StylePalette:
+    """输出用到的全部样式：边框、对齐、字体对象只创建一次。
+    每种样式组合第一次使用时登记到工作簿的样式表，之后的单元格直接复制登记好的样式索引，
+    省去逐格新建 Border/Alignment 再到样式表里哈希查重的开销。样式索引属于单个工作簿，每个输出各用一份"""
+
+    def __init__(self):
+        thin, thick = Side(border_style="thin"), Side(border_style="medium")
+        # 键为 (左, 右, 上, 下) 是否粗线；全细线即普通单元格，其余为区块外框
+        self.borders = {(l, r, t, b): Border(left=thick if l else thin, right=thick if r else thin,
+                                             top=thick if t else thin, bottom=thick if b else thin)
+                        for l in (False, True) for r in (False, True) for t in (False, True) for b in (False, True)}
+        self.alignments = {
+            'center': Alignment(horizontal="center", vertical="center", wrap_text=True),
+            'left_center': Alignment(horizontal="left", vertical="center", wrap_text=True),
+            'left': Alignment(vertical="center", horizontal="left"),
+        }
+        self.bold = Font(bold=True)
+        self._registered = {}
+
+    def apply(self, cell, edges=(False, False, False, False), align=None, number_format=None, bold=False):
+        key = (edges, align, number_format, bold)
+        style = self._registered.get(key)
+        if style is None:
+            cell._style = StyleArray()
+            cell.border = self.borders[edges]
+            if align: cell.alignment = self.alignments[align]
+            if number_format: cell.number_format = number_format
+            if bold: cell.font = self.bold
+            self._registered[key] = copy(cell._style)
+        else:
+            cell._style = copy(style)
+        return cell
+
+
+def body_styles(columns):
+    """明细各列的 (对齐, 数字格式)"""
+    return [('center' if name in ['序号', '单位', '数量'] else 'left',
+             '0.00' if name in ['单价', '金额'] else None) for name in columns]
+
+
+INFO_ALIGN = ['center', 'left_center', 'center']  # 日期居中、询价人靠左、单号居中
+
+
+class WorkbookWriter:
+    """常规输出：整张表保存在内存中，逐格写入值与样式"""
+
+    def __init__(self, columns, append_to=None, curr_row=2):
+        """append_to 为已有的输出文件时在其后追加，curr_row 是上次写完后的下一个区块起始行"""
+        self.columns = columns
+        self.palette = StylePalette()
+        self.body_styles = body_styles(columns)
+        if append_to:
+            from openpyxl import load_workbook
+            self.wb = load_workbook(append_to)
+            self.ws = self.wb["汇总工单"]
+            self.curr_row = curr_row
+            return
+
+        self.wb = Workbook()
+        self.ws = self.wb.active
+        self.ws.title = "汇总工单"
+        # 表头
+        for i, name in enumerate(self.columns, 1):
+            self.palette.apply(self.ws.cell(1, i, name), align='center', bold=True)
+        self.curr_row = 2
+
+    @property
+    def has_data(self):
+        return self.curr_row > 2
+
+    def write_section(self, section, rows):
+        """rows 为去重后需要写入的明细；为空时信息行留在原位，由下一个区块覆盖。
+        区块首尾行在写入前就已确定，外框（四周粗线、内部细线）随每个单元格一次写好"""
+        ws, apply = self.ws, self.palette.apply
+        last_r = len(rows)
+        # 信息行写入与对齐；空区块的信息行不画外框
+        info = [section['date'], section['info'], section['order_no']]
+        for c in range(1, 9):
+            cell = ws.cell(self.curr_row, c, info[c - 1]) if c <= 3 else ws.cell(self.curr_row, c)
+            edges = (c == 1, c == 8, True, False) if rows else (False, False, False, False)
+            apply(cell, edges, INFO_ALIGN[c - 1] if c <= 3 else None)
+        self.curr_row += 1
+
+        for written_count, row in enumerate(rows, 1):
+            for col_idx, col_name in enumerate(self.columns, 1):
+                val = row[col_name]
+                if col_name == '序号': val = written_count
+                align, number_format = self.body_styles[col_idx - 1]
+                apply(ws.cell(self.curr_row, col_idx, val), (col_idx == 1, col_idx == 8, False, written_count == last_r),
+                      align, number_format)
+            self.curr_row += 1
+
+        if not rows:
+            self.curr_row -= 1
+        else:
+            self.curr_row += 1
+
+    def save(self, path):
+        self.wb.save(path)
+
+
+class StreamingWorkbookWriter:
+    """低内存输出：write_only 工作簿，每行写出后即序列化到临时文件，内存占用与输出行数无关。
+    已写出的行不能再修改，所以区块的粗外框在写每一行时就确定好；没有新明细的区块直接跳过"""
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.wb = Workbook(write_only=True)
+        self.ws = self.wb.create_sheet("汇总工单")
+        self.palette = StylePalette()
+        self.body_styles = body_styles(columns)
+
+        self.ws.append([self.palette.apply(WriteOnlyCell(self.ws, name), align='center', bold=True)
+                        for name in self.columns])
+        self.sections_written = 0
+        self.curr_row = 2  # 与 WorkbookWriter 含义相同：下一个区块的起始行（含区块间的空行）
+
+    @property
+    def has_data(self):
+        return self.sections_written > 0
+
+    def write_section(self, section, rows):
+        if not rows: return
+        if self.sections_written: self.ws.append([])  # 区块之间空一行
+        ws, apply = self.ws, self.palette.apply
+        last_r, last_c = len(rows), len(self.columns) - 1
+
+        # 区块内第 r 行（0 为信息行）、第 c 列：四周粗线，内部细线
+        info = [section['date'], section['info'], section['order_no']]
+        ws.append([apply(WriteOnlyCell(ws, info[c] if c < 3 else None), (c == 0, c == last_c, True, last_r == 0),
+                         INFO_ALIGN[c] if c < 3 else None)
+                   for c in range(len(self.columns))])
+
+        for r, row in enumerate(rows, 1):
+            cells = []
+            for c, col_name in enumerate(self.columns):
+                val = r if col_name == '序号' else row[col_name]
+                align, number_format = self.body_styles[c]
+                cells.append(apply(WriteOnlyCell(ws, val), (c == 0, c == last_c, False, r == last_r),
+                                   align, number_format))
+            ws.append(cells)
+        self.sections_written += 1
+        self.curr_row += len(rows) + 2
+
+    def save(self, path):
+        self.wb.save(path)
+
+    def close(self):
+        """没有保存就结束时（没有明细或中途出错）调用：结束 write_only 工作表的写入并删除它的临时文件，
+        否则解释器退出时会报 I/O operation on closed file，临时文件也留在磁盘上。save() 之后调用不做任何事"""
+        if self.ws.closed: return
+        self.ws.close()
+        self.ws._writer.cleanup()